@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_events(n=4000, n_users=150, seed=0):
+    """Synthetic viewing events with every column the user features read."""
+    rng = np.random.default_rng(seed)
+    # A few heavy users so the key distribution is skewed like 'anonyme'
+    users = np.where(rng.random(n) < 0.2, rng.integers(0, 3, n), rng.integers(0, n_users, n))
+    start = pd.Timestamp('2024-01-01')
+    return pd.DataFrame({
+        'user_key': [f'user{u:04d}' for u in users],
+        'visitor_id_hash': rng.choice(['v1', 'v2', 'v3', 'v4'], n),
+        'date': start + pd.to_timedelta(rng.integers(0, 120 * 86400, n), unit='s'),
+        'programme': rng.choice([f'prog{p}' for p in range(30)] + [None], n),
+        'content_time_spent': np.where(rng.random(n) < 0.05, np.nan, rng.integers(0, 3600, n).astype(float)),
+        'statut_connexion': rng.random(n) < 0.7,
+        'modele': rng.choice(['gratuit', 'premium'], n),
+        'enchainement': rng.choice(['enchainement', 'manuel'], n),
+        'reprise_media': rng.choice(['reprise', 'debut'], n),
+        'type_declenchement': rng.choice(['actif', 'passif'], n),
+        'progress_marker_75_percent': np.where(rng.random(n) < 0.5, np.nan, 1.0),
+        'progress_marker_95_percent': np.where(rng.random(n) < 0.6, np.nan, 1.0),
+        'videoinitiate': rng.integers(0, 2, n),
+        'theme': rng.choice(['Drame', 'Humour', 'Unknown'], n),
+        'audience': rng.choice(['Adulte', 'Jeunesse', 'Unknown'], n),
+        'cancelled_on': np.where(rng.random(n) < 0.3, start + pd.to_timedelta(rng.integers(30, 120, n), unit='D'), pd.NaT),
+    })
+
+
+@pytest.fixture
+def events():
+    return make_events()
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy.cluster.hierarchy import fcluster, is_valid_linkage, linkage
+from sklearn.metrics import adjusted_rand_score, silhouette_score
+from sklearn.mixture import GaussianMixture
+
+from toutv_segmentation.compression import (
+    WeightedGaussianMixture, compress_rows, weighted_silhouette_score, weighted_ward_linkage)
+
+
+def _duplicated_rows(n_unique=60, n_features=3, seed=0):
+    # Tie-free unique vectors, each repeated 1 to 6 times
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=4, size=(3, n_features))
+    vectors = centers[rng.integers(0, 3, n_unique)] + rng.normal(size=(n_unique, n_features))
+    weights = rng.integers(1, 7, n_unique)
+    rows = np.repeat(vectors, weights, axis=0)
+    return vectors, weights, rng.permutation(rows)
+
+
+def test_compress_rows_round_trip():
+    _, weights, rows = _duplicated_rows()
+    compressed = compress_rows(rows)
+    assert compressed.n_unique == len(weights)
+    assert compressed.weights.sum() == len(rows)
+    np.testing.assert_array_equal(compressed.expand(compressed.vectors), rows.astype(np.float32))
+
+
+@pytest.mark.parametrize('block_elements', [2 ** 24, 500])
+def test_weighted_silhouette_matches_sklearn(block_elements):
+    _, _, rows = _duplicated_rows()
+    compressed = compress_rows(rows)
+    labels = np.random.default_rng(1).integers(0, 3, compressed.n_unique)
+    # A cluster of a single row, whose silhouette is 0 as in sklearn
+    labels[np.flatnonzero(compressed.weights == 1)[0]] = 3
+    expected = silhouette_score(compressed.expand(compressed.vectors).astype(np.float64), compressed.expand(labels))
+    result = weighted_silhouette_score(compressed.vectors, labels, compressed.weights, block_elements=block_elements)
+    assert np.isclose(result, expected)
+
+
+def test_weighted_ward_matches_scipy():
+    vectors, weights, _ = _duplicated_rows()
+    expanded = np.repeat(vectors, weights, axis=0)
+    expected = linkage(expanded, method='ward')
+    result = weighted_ward_linkage(vectors, weights)
+
+    assert is_valid_linkage(result)
+    # scipy first merges the duplicates at height 0, then follows the same merges
+    heights = expected[:, 2][expected[:, 2] > 1e-9]
+    np.testing.assert_allclose(result[:, 2], heights, rtol=1e-9, atol=1e-9)
+    assert result[-1, 3] == len(vectors)
+    for k in (2, 3, 5, 8):
+        labels = fcluster(result, k, criterion='maxclust')
+        expected_labels = fcluster(expected, k, criterion='maxclust')
+        assert adjusted_rand_score(np.repeat(labels, weights), expected_labels) == 1.0
+
+
+def test_weighted_gmm_bic_equals_expanded_bic():
+    vectors, weights, _ = _duplicated_rows()
+    expanded = np.repeat(vectors, weights, axis=0)
+    model = WeightedGaussianMixture(n_components=3, random_state=0).fit(vectors, weights)
+    assert np.isclose(model.bic(vectors, weights), model.bic(expanded))
+    np.testing.assert_array_equal(np.repeat(model.predict(vectors), weights), model.predict(expanded))
+
+
+def test_weighted_gmm_matches_sklearn_on_unit_weights():
+    _, _, rows = _duplicated_rows(n_unique=400)
+    model = WeightedGaussianMixture(n_components=3, random_state=0).fit(rows)
+    reference = GaussianMixture(n_components=3, random_state=0).fit(rows)
+    assert adjusted_rand_score(model.predict(rows), reference.predict(rows)) == 1.0
+    assert np.isclose(model.bic(rows), reference.bic(rows), rtol=1e-3)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from toutv_segmentation.coviewing import (
+    build_user_programme_matrix, coviewing, coviewing_by, open_user_programme_matrix, programme_affinity,
+    programme_engagement, write_user_programme_matrix)
+
+
+def _pairs(events):
+    # Users who watched both programmes of each ordered pair, by self-merge
+    viewed = events.dropna(subset=['user_key', 'programme'])[['user_key', 'programme']].drop_duplicates()
+    pairs = viewed.merge(viewed, on='user_key')
+    pairs = pairs[pairs['programme_x'] != pairs['programme_y']]
+    return pairs.groupby(['programme_x', 'programme_y']).size()
+
+
+def _coviewers(cov):
+    pairs = cov.coviewers.tocoo()
+    index = pd.MultiIndex.from_arrays([cov.programmes[pairs.row], cov.programmes[pairs.col]])
+    return pd.Series(pairs.data, index=index).sort_index()
+
+
+def test_matrix_matches_groupby(events, tmp_path):
+    matrix = build_user_programme_matrix(events)
+    valid = events.dropna(subset=['user_key', 'programme'])
+    grouped = valid.groupby(['user_key', 'programme'])
+    counts = matrix.counts.tocoo()
+    result = pd.Series(counts.data, index=pd.MultiIndex.from_arrays(
+        [matrix.users[counts.row], matrix.programmes[counts.col]])).sort_index()
+    pd.testing.assert_series_equal(result, grouped.size().sort_index(), check_names=False, check_dtype=False)
+
+    write_user_programme_matrix(matrix, str(tmp_path))
+    reopened = open_user_programme_matrix(str(tmp_path))
+    assert list(reopened.users) == list(matrix.users)
+    assert (reopened.watch_time != matrix.watch_time).nnz == 0
+
+
+def test_coviewing_matches_self_merge(events):
+    cov = coviewing(build_user_programme_matrix(events))
+    expected = _pairs(events).sort_index()
+    pd.testing.assert_series_equal(_coviewers(cov), expected, check_names=False, check_dtype=False)
+    viewers = events.dropna(subset=['programme']).groupby('programme')['user_key'].nunique()
+    np.testing.assert_array_equal(cov.viewers, viewers.reindex(cov.programmes).to_numpy())
+
+
+def test_coviewing_by_group_and_affinity(events):
+    labels = events.drop_duplicates('user_key').set_index('user_key')['modele']
+    matrix = build_user_programme_matrix(events)
+    for group, cov in coviewing_by(matrix, labels, min_coviewers=2).items():
+        subset = events[events['user_key'].map(labels) == group]
+        expected = _pairs(subset)
+        pd.testing.assert_series_equal(_coviewers(cov), expected[expected >= 2].sort_index(),
+                                       check_names=False, check_dtype=False)
+
+        affinity = programme_affinity(cov, top=3, metric='jaccard')
+        assert affinity.groupby('programme')['rank'].max().le(3).all()
+        first = affinity[affinity['rank'] == 1].set_index('programme')['jaccard']
+        assert (first >= affinity.groupby('programme')['jaccard'].max() - 1e-12).all()
+
+
+def test_engagement_matches_groupby(events):
+    labels = events.drop_duplicates('user_key').set_index('user_key')['modele']
+    engagement = programme_engagement(build_user_programme_matrix(events), labels)
+    valid = events.dropna(subset=['user_key', 'programme']).assign(group=lambda e: e['user_key'].map(labels))
+    expected = valid.groupby(['group', 'programme']).agg(
+        viewers=('user_key', 'nunique'), events=('user_key', 'size'),
+        watch_time=('content_time_spent', lambda t: t.fillna(0).sum()))
+    result = engagement.set_index(['group', 'programme'])[['viewers', 'events', 'watch_time']].sort_index()
+    pd.testing.assert_frame_equal(result, expected.sort_index(), check_dtype=False, rtol=1e-5)
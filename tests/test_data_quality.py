@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from toutv_segmentation.data_quality import diff_reports, profile_table, update_report
+
+
+def _events(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'rcid_hash': rng.choice(['a' * 64, 'b' * 64, 'not-a-hash', None], n),
+        'modele': rng.choice(['gratuit', 'premium', None], n),
+        'content_time_spent': np.where(rng.random(n) < 0.1, np.nan, rng.exponential(1200, n)),
+        'progress_marker_75_percent': np.where(rng.random(n) < 0.3, np.nan, 1.0),
+    })
+
+
+def _profile(df):
+    return profile_table(
+        df, 'df', chunksize=3000, keys=['rcid_hash'], null_by=['modele'],
+        patterns={'rcid_hash': r'^[0-9a-f]{64}$'},
+        describe_when={'watch_time_missing_progress': (
+            lambda c: c['progress_marker_75_percent'].isna(), 'content_time_spent')},
+        count_when={'modele': (None, ['modele'])})
+
+
+def test_identical_runs_have_no_diff(tmp_path):
+    df = _events()
+    first, second = _profile(df), _profile(df)
+    assert diff_reports(first, second).empty
+
+    update_report(first, str(tmp_path))
+    assert update_report(second, str(tmp_path)).empty
+
+
+def test_profile_matches_pandas():
+    df = _events()
+    report = _profile(df)
+    assert report['rows'] == len(df)
+    assert report['columns']['content_time_spent']['nulls'] == df['content_time_spent'].isna().sum()
+
+    valid = df['rcid_hash'].str.fullmatch(r'[0-9a-f]{64}').fillna(False).astype(bool)
+    patterns = report['patterns']['rcid_hash']
+    assert patterns['invalid_rows'] == (~valid).sum()
+    assert patterns['invalid_values'] == ['nan', 'not-a-hash']
+
+    watch_time = df.loc[df['progress_marker_75_percent'].isna(), 'content_time_spent']
+    describe = report['describe']['watch_time_missing_progress']
+    assert describe['count'] == watch_time.count()
+    assert np.isclose(describe['mean'], watch_time.mean())
+    assert describe['min'] == watch_time.min() and describe['max'] == watch_time.max()
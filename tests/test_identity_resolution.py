@@ -0,0 +1,37 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from toutv_segmentation.identity_resolution import (
+    HASH_PATTERN, VISITOR_PREFIX, hot_keys, identity_summary, resolve_user_keys, valid_rcid_mask)
+
+
+HASH = 'a' * 64
+
+
+def test_anonymous_rows_are_keyed_by_visitor():
+    df = pd.DataFrame({
+        'rcid_hash': [HASH, 'anonyme', 'anonyme', 'anonyme', None, 'not a hash'],
+        'visitor_id_hash': ['v1', 'v1', 'v2', None, 'v3', 'nan'],
+    })
+    resolve_user_keys(df)
+    assert list(df['user_key']) == [HASH, VISITOR_PREFIX + 'v1', VISITOR_PREFIX + 'v2', 'anonyme',
+                                    VISITOR_PREFIX + 'v3', 'not a hash']
+    assert list(df['identity_type']) == ['rcid', 'visitor', 'visitor', 'unresolved', 'visitor', 'unresolved']
+
+    summary = identity_summary(df)
+    assert summary.loc['visitor', 'rows'] == 3 and summary.loc['visitor', 'users'] == 3
+
+
+def test_valid_rcid_mask_matches_row_wise_regex():
+    values = pd.Series(np.random.default_rng(0).choice([HASH, 'B' * 64, 'anonyme', 'xyz', None], 1000))
+    expected = values.map(lambda v: isinstance(v, str) and re.match(HASH_PATTERN, v) is not None)
+    pd.testing.assert_series_equal(valid_rcid_mask(values), expected, check_names=False)
+
+
+def test_hot_keys():
+    keys = pd.Series(['anonyme'] * 30_000 + [f'u{i}' for i in range(70_000)])
+    hot = hot_keys(keys)
+    assert list(hot.index) == ['anonyme'] and hot.iloc[0] == 30_000
+    assert hot_keys(keys.iloc[20_000:]).empty
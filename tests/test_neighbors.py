@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from toutv_segmentation.neighbors import LOOKALIKE_FEATURES, build_index, find_lookalikes, open_index
+
+
+def _users(n, seed, prefix='sub'):
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({
+        'num_devices': rng.integers(1, 5, n) + rng.random(n),
+        'unique_programs': rng.poisson(10, n) + rng.random(n),
+        'avg_watch_time': rng.exponential(900, n),
+    })
+    frame['user_key'] = [f'{prefix}{i:05d}' for i in range(n)]
+    return frame
+
+
+def _exact(index, frame, queries, k):
+    # Brute-force neighbours in the index's standardized space
+    vectors, query_vectors = index.transform(frame), index.transform(queries)
+    distances = np.linalg.norm(query_vectors[:, None, :] - vectors[None, :, :], axis=2)
+    order = np.argsort(distances, axis=1)[:, :k]
+    return np.take_along_axis(distances, order, axis=1), frame['user_key'].to_numpy()[order]
+
+
+def _assert_exact(index, frame, queries, k=5):
+    distances, ids = index.query(queries, k=k, batch_size=37, n_jobs=2)
+    expected_distances, expected_ids = _exact(index, frame, queries, k)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-9, atol=1e-9)
+    np.testing.assert_array_equal(np.char.decode(ids, 'utf-8'), expected_ids)
+
+
+@pytest.mark.parametrize('algorithm', ['kd_tree', 'ball_tree'])
+def test_queries_are_exact(algorithm):
+    subscribers, queries = _users(500, 0), _users(200, 1, 'free')
+    index = build_index(subscribers, subscribers['user_key'], algorithm=algorithm)
+    _assert_exact(index, subscribers, queries)
+
+    table = find_lookalikes(index, queries, queries['user_key'], k=3)
+    assert len(table) == 3 * len(queries)
+    assert table.groupby('user_key')['distance'].apply(lambda d: d.is_monotonic_increasing).all()
+
+
+def test_inserts_updates_and_removals_stay_exact():
+    subscribers, queries = _users(500, 0), _users(100, 1, 'free')
+    index = build_index(subscribers.iloc[:400], subscribers['user_key'].iloc[:400], rebuild_fraction=0.5)
+
+    # New users go to the delta buffer, then replace an indexed user's vector
+    index.add(subscribers.iloc[400:], subscribers['user_key'].iloc[400:])
+    assert len(index.delta_ids) == 100
+    changed = subscribers.iloc[:10].assign(avg_watch_time=lambda f: f['avg_watch_time'] * 3)
+    index.add(changed, changed['user_key'])
+    current = pd.concat([changed, subscribers.iloc[10:]])
+    assert len(index) == len(current)
+    _assert_exact(index, current, queries)
+
+    index.remove(current['user_key'].iloc[:50])
+    _assert_exact(index, current.iloc[50:], queries)
+
+
+def test_reopened_index_syncs_with_current_users(tmp_path):
+    subscribers, queries = _users(500, 0), _users(100, 1, 'free')
+    build_index(subscribers, subscribers['user_key']).save(str(tmp_path))
+
+    current = pd.concat([
+        subscribers.iloc[20:300],
+        subscribers.iloc[300:].assign(unique_programs=lambda f: f['unique_programs'] + 5),
+        _users(30, 2, 'new'),
+    ], ignore_index=True)
+    index = open_index(str(tmp_path))
+    assert index.sync(current, current['user_key']) == (30, 200, 20)
+    assert index.sync(current, current['user_key']) == (0, 0, 0)
+    _assert_exact(index, current, queries)
+    assert index.features == LOOKALIKE_FEATURES
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.decomposition import PCA
+
+from toutv_segmentation.reduction import fit_reduction, open_reduction, write_reduction
+
+
+FEATURES = [f'x{i}' for i in range(6)]
+
+
+def _frame(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    latent = rng.normal(size=(n, 2))
+    values = latent @ rng.normal(size=(2, len(FEATURES))) * [1, 10, 100, 1, 5, 50] + rng.normal(size=(n, len(FEATURES)))
+    frame = pd.DataFrame(values, columns=FEATURES)
+    frame.iloc[::50, 2] = np.nan
+    return frame
+
+
+def _exact_pca(frame):
+    values = frame[FEATURES].to_numpy()
+    mean, scale = np.nanmean(values, axis=0), np.nanstd(values, axis=0)
+    standardized = np.nan_to_num((values - mean) / scale)
+    return PCA().fit(standardized), standardized
+
+
+def _assert_same_axes(components, expected):
+    # Principal axes are defined up to their sign
+    signs = np.sign((components * expected).sum(axis=1))
+    np.testing.assert_allclose(components * signs[:, None], expected, atol=1e-6)
+
+
+@pytest.mark.parametrize('method', ['incremental', 'randomized'])
+def test_reduction_matches_exact_pca(method):
+    frame = _frame()
+    exact, standardized = _exact_pca(frame)
+    reduction = fit_reduction(frame, FEATURES, n_components=3, method=method, batch_size=700, chunksize=1000)
+    assert reduction.n_components == 3
+    np.testing.assert_allclose(reduction.explained_variance_ratio, exact.explained_variance_ratio_[:3], rtol=1e-4)
+    _assert_same_axes(reduction.components, exact.components_[:3])
+    np.testing.assert_allclose(np.abs(reduction.transform(frame, chunksize=999)),
+                               np.abs(exact.transform(standardized)[:, :3]), atol=1e-3)
+
+
+def test_variance_fraction_and_csv_source(tmp_path):
+    frame = _frame()
+    path = tmp_path / 'features.csv'
+    frame.to_csv(path, index=False)
+    exact, _ = _exact_pca(frame)
+    reduction = fit_reduction(str(path), FEATURES, n_components=0.95, chunksize=800)
+    expected = int(np.searchsorted(np.cumsum(exact.explained_variance_ratio_), 0.95)) + 1
+    assert reduction.n_components == expected
+    assert reduction.meta['n_rows'] == len(frame)
+
+    write_reduction(reduction, str(tmp_path), 'pca')
+    reopened = open_reduction(str(tmp_path), 'pca')
+    np.testing.assert_array_equal(reopened.components, reduction.components)
+    # All components: the inverse projection recovers the raw values
+    full = fit_reduction(frame, FEATURES, n_components=len(FEATURES))
+    complete = frame.fillna(frame.mean())
+    np.testing.assert_allclose(full.inverse_transform(full.transform(complete).astype(np.float64)),
+                               complete.to_numpy(), rtol=1e-4, atol=1e-2)
+
+
+def test_randomized_caps_components_at_feature_count():
+    reduction = fit_reduction(_frame(), FEATURES, n_components=50, method='randomized')
+    assert reduction.n_components == len(FEATURES)
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from toutv_segmentation.feature_store import write_feature_matrix
+from toutv_segmentation.segment import evaluate_gmm
+
+
+def test_evaluate_gmm_on_float32_feature_matrix(tmp_path):
+    # Collinear small-integer features: on the float32 memmap, sklearn fails
+    # with "ill-defined empirical covariance" at k=5
+    rng = np.random.default_rng(1)
+    n = 5000
+    a = rng.poisson(3, n).astype(float)
+    frame = pd.DataFrame({
+        'a': a,
+        'b': a * 3 + 1,
+        'c': np.where(rng.random(n) < 0.6, 0, rng.integers(1, 50, n)),
+        'd': rng.integers(1, 3, n),
+        'e': a * a,
+    })
+    matrix = write_feature_matrix(str(tmp_path), 'group', frame, np.arange(n).astype(str))
+    assert matrix.data.dtype == np.float32
+
+    bic = evaluate_gmm(matrix.data, k_values=[4, 5, 6])
+    assert list(bic.index) == [4, 5, 6]
+    assert np.isfinite(bic['bic']).all()
+
+    weighted = evaluate_gmm(matrix.data, k_values=[5], sample_weight=np.ones(n))
+    assert np.isfinite(weighted['bic']).all()
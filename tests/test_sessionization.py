@@ -0,0 +1,100 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from toutv_segmentation.sessionization import SESSION_FEATURES, has_time_of_day, session_features
+from toutv_segmentation.user_features import compute_user_features
+
+
+GAP = pd.Timedelta(minutes=30)
+
+
+def _events(n=3000, n_users=60, seed=0):
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    return pd.DataFrame({
+        'user_key': rng.integers(0, n_users, n).astype(str),
+        # Clustered times so there are both short gaps and long ones
+        'date': start + pd.to_timedelta(rng.integers(0, 20, n) * 86400 + rng.integers(0, 4 * 3600, n), unit='s'),
+        'content_time_spent': np.where(rng.random(n) < 0.05, np.nan, rng.integers(0, 3000, n)),
+        'programme': rng.choice(['a', 'b', 'c', None], n, p=[0.5, 0.3, 0.15, 0.05]),
+        'reprise_media': rng.choice(['reprise', 'debut'], n),
+    })
+
+
+def _naive_sessions(df, gap=GAP, binge_min_episodes=3):
+    # One Python loop per user over its events in time order
+    rows = {}
+    for user, events in df.groupby('user_key', sort=False):
+        events = events.sort_values('date', kind='stable')
+        sessions, end = [], None
+        for _, event in events.iterrows():
+            start = event['date']
+            seconds = 0 if pd.isna(event['content_time_spent']) else max(event['content_time_spent'], 0)
+            if end is None or start - end > gap:
+                sessions.append({'start': start, 'events': 0, 'chained': 0,
+                                 'reprise': event['reprise_media'] == 'reprise', 'previous': None})
+            session = sessions[-1]
+            if session['events'] and pd.notna(event['programme']) and event['programme'] == session['previous']:
+                session['chained'] += 1
+            session['events'] += 1
+            session['previous'] = event['programme']
+            # Latest end seen so far in the user's stream
+            end = start + pd.Timedelta(seconds=seconds) if end is None else max(end, start + pd.Timedelta(seconds=seconds))
+            session['end'] = end
+        gaps = [(b['start'] - a['end']) / pd.Timedelta(hours=1) for a, b in zip(sessions, sessions[1:])]
+        rows[user] = {
+            'session_count': len(sessions),
+            'median_session_minutes': np.median([(s['end'] - s['start']) / pd.Timedelta(minutes=1) for s in sessions]),
+            'avg_events_per_session': np.mean([s['events'] for s in sessions]),
+            'binge_episodes_per_session': np.mean([s['chained'] for s in sessions]),
+            'pct_binge_sessions': np.mean([s['chained'] >= binge_min_episodes - 1 for s in sessions]) * 100,
+            'pct_reprise_sessions': np.mean([s['reprise'] for s in sessions]) * 100,
+            'median_session_gap_hours': np.median(gaps) if gaps else np.nan,
+        }
+    return pd.DataFrame.from_dict(rows, orient='index')[SESSION_FEATURES]
+
+
+def test_session_features_match_naive_loop():
+    df = _events()
+    expected = _naive_sessions(df).sort_index()
+    result = session_features(df).sort_index()
+    assert list(result.index) == list(expected.index)
+    pd.testing.assert_frame_equal(result, expected, check_names=False, check_dtype=False)
+
+
+def test_day_level_dates_leave_session_features_out():
+    df = _events()
+    assert has_time_of_day(df['date'])
+    df['date'] = df['date'].dt.normalize()
+    assert not has_time_of_day(df['date'])
+
+    with pytest.warns(UserWarning, match='no time of day'):
+        features = compute_user_features(df.assign(**_user_feature_columns(len(df))))
+    assert not set(SESSION_FEATURES) & set(features.columns)
+
+
+def test_timed_dates_keep_session_features():
+    df = _events()
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        features = compute_user_features(df.assign(**_user_feature_columns(len(df))))
+    assert set(SESSION_FEATURES) <= set(features.columns)
+
+
+def _user_feature_columns(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return {
+        'visitor_id_hash': rng.choice(['v1', 'v2', 'v3'], n),
+        'statut_connexion': rng.choice(['Connecté', 'Non connecté'], n),
+        'modele': rng.choice(['gratuit', 'premium'], n),
+        'enchainement': rng.choice(['enchainement', None], n),
+        'type_declenchement': rng.choice(['auto', 'manuel'], n),
+        'progress_marker_75_percent': np.where(rng.random(n) < 0.5, np.nan, 1.0),
+        'progress_marker_95_percent': np.where(rng.random(n) < 0.6, np.nan, 1.0),
+        'videoinitiate': rng.integers(0, 2, n),
+        'theme': rng.choice(['Drame', 'Humour', None], n),
+        'audience': rng.choice(['Adulte', 'Jeunesse'], n),
+    }
@@ -0,0 +1,45 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from toutv_segmentation.feature_store import write_feature_matrix
+from toutv_segmentation.stability_analysis import co_assignment_scores, stability_analysis
+
+
+def _blobs(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[0, 0, 0], [10, 0, 0], [0, 10, 0]])
+    return (centers[rng.integers(0, 3, n)] + rng.normal(size=(n, 3))).astype(np.float32)
+
+
+def test_co_assignment_matches_pairwise_loop():
+    rng = np.random.default_rng(0)
+    label_sets = [rng.integers(0, 3, 40) for _ in range(7)]
+    consensus = np.array([np.mean([labels[i] == labels[j] for labels in label_sets])
+                          for i, j in itertools.combinations(range(40), 2)])
+    co_assignment, pac = co_assignment_scores(label_sets)
+    assert np.isclose(co_assignment, np.maximum(consensus, 1 - consensus).mean())
+    assert np.isclose(pac, ((consensus > 0.1) & (consensus < 0.9)).mean())
+
+
+def test_stability_of_separated_clusters(tmp_path):
+    data = _blobs()
+    stored = write_feature_matrix(str(tmp_path), 'g', pd.DataFrame(data), np.arange(len(data)).astype(str),
+                                  standardize=False)
+    groups = {'array': data, 'memmap': stored}
+    options = dict(k_values=[2, 3], n_replicates=6, eval_size=150, n_init=3, seed=7)
+
+    result = stability_analysis(groups, n_jobs=2, **options)
+    assert list(result.index) == [('array', 2), ('array', 3), ('memmap', 2), ('memmap', 3)]
+    for group in groups:
+        assert result.loc[(group, 3), 'ari_mean'] == 1.0
+        assert result.loc[(group, 3), 'pac'] == 0.0
+    # Seeded per task, so the scores do not depend on the number of workers
+    pd.testing.assert_frame_equal(stability_analysis(groups, n_jobs=1, **options), result)
+
+
+def test_bootstrap_resampling():
+    result = stability_analysis({'g': _blobs()}, k_values=[3], n_replicates=4, resample='bootstrap',
+                                max_sample_size=100, eval_size=100, n_init=3, n_jobs=1)
+    assert result.loc[('g', 3), 'co_assignment'] == 1.0
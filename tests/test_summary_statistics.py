@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from toutv_segmentation.summary_statistics import (
+    QuantileSketch, StreamingMoments, iter_frame_chunks, summarize_chunks)
+
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_errors(sketch, values):
+    # Normalized distance between the requested rank and the rank of the answer
+    values = np.sort(values)
+    answers = sketch.quantile(QUANTILES)
+    below = np.searchsorted(values, answers, side='left') / len(values)
+    at_most = np.searchsorted(values, answers, side='right') / len(values)
+    return np.maximum(below - QUANTILES, 0) + np.maximum(QUANTILES - at_most, 0)
+
+
+@pytest.mark.parametrize('distribution', ['normal', 'exponential', 'integers'])
+def test_rank_error_within_bound(distribution):
+    rng = np.random.default_rng(42)
+    values = {
+        'normal': lambda: rng.normal(size=200_000),
+        'exponential': lambda: rng.exponential(1200, size=200_000),
+        'integers': lambda: rng.poisson(2, size=200_000).astype(float),
+    }[distribution]()
+    sketch = QuantileSketch()
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+    assert not sketch.is_exact
+    assert sketch.n == len(values)
+    assert _rank_errors(sketch, values).max() <= sketch.rank_error()
+
+
+def test_merged_sketches_within_bound():
+    # The bound holds for each quantile with 99% confidence: over many merged
+    # sketches, at most 1% of the quantiles may exceed it
+    errors = []
+    for seed in range(20):
+        rng = np.random.default_rng(seed)
+        parts = [rng.lognormal(size=30_000) for _ in range(8)]
+        sketch = QuantileSketch(seed=seed)
+        for part in parts:
+            sketch.merge(QuantileSketch(seed=seed + 100).update(part))
+        values = np.concatenate(parts)
+        assert sketch.n == len(values)
+        errors.append(_rank_errors(sketch, values) / sketch.rank_error())
+    errors = np.concatenate(errors)
+    assert (errors > 1).mean() <= 0.01
+    assert errors.max() <= 1.5
+
+
+def test_exact_below_k():
+    values = np.random.default_rng(0).normal(size=150)
+    sketch = QuantileSketch(k=200).update(values)
+    assert sketch.is_exact and sketch.rank_error() == 0.0
+    assert np.allclose(sketch.quantile(QUANTILES), pd.Series(values).quantile(QUANTILES))
+
+
+def test_default_seed_is_reproducible():
+    values = np.random.default_rng(3).exponential(size=100_000)
+    first = summarize_chunks(iter_frame_chunks(pd.DataFrame({'x': values}), 10_000), ['x'])
+    second = summarize_chunks(iter_frame_chunks(pd.DataFrame({'x': values}), 10_000), ['x'])
+    assert first.iqr_bounds('x') == second.iqr_bounds('x')
+    assert first.describe().equals(second.describe())
+
+
+def test_streaming_moments_match_numpy():
+    values = np.random.default_rng(1).normal(5, 3, size=10_001)
+    values[::17] = np.nan
+    moments = StreamingMoments()
+    for chunk in np.array_split(values, 13):
+        moments.update(chunk)
+    finite = values[~np.isnan(values)]
+    assert moments.count == finite.size
+    assert np.isclose(moments.mean, finite.mean())
+    assert np.isclose(moments.std(), finite.std(ddof=1))
+    assert moments.min == finite.min() and moments.max == finite.max()
@@ -0,0 +1,28 @@
+import multiprocessing
+
+import pandas as pd
+import pytest
+
+from toutv_segmentation.user_features import compute_user_features, compute_user_features_partitioned
+
+
+@pytest.mark.parametrize('n_shards', [1, 3, 8])
+def test_partitioned_matches_serial(events, n_shards, tmp_path):
+    expected = compute_user_features(events).sort_index()
+    result = compute_user_features_partitioned(
+        events, n_shards=n_shards, n_jobs=2, shard_dir=str(tmp_path / 'shards'), chunksize=700,
+        hot_share=0.05, mp_context=multiprocessing.get_context('spawn'))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_partitioned_refuses_non_empty_shard_dir(events, tmp_path):
+    (tmp_path / 'stale').mkdir()
+    with pytest.raises(ValueError, match='not empty'):
+        compute_user_features_partitioned(events, n_shards=2, n_jobs=1, shard_dir=str(tmp_path))
+
+
+def test_partitioned_empty_events(events):
+    empty = events.iloc[:0]
+    result = compute_user_features_partitioned(empty, n_shards=2, n_jobs=1)
+    assert result.empty
+    assert list(result.columns) == list(compute_user_features(empty).columns)
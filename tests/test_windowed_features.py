@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from toutv_segmentation.user_features import event_flags
+from toutv_segmentation.windowed_features import compute_windowed_features, is_window_column
+
+
+WINDOWS = (1, 7, 30, 90)
+
+
+def _brute_force(events, windows, as_of=None, anchor=None):
+    # One filtered groupby per window on the calendar days
+    events = events[events['date'].notna()]
+    days = pd.to_datetime(events['date']).dt.normalize()
+    users = pd.Index(sorted(events['user_key'].unique()), name='user_key')
+    as_of = days.max() if as_of is None else pd.Timestamp(as_of).normalize()
+    reference = pd.Series(as_of, index=users)
+    if anchor is not None:
+        latest = pd.to_datetime(events[anchor]).dt.normalize().groupby(events['user_key']).max().dropna()
+        reference[latest.index] = latest
+    reference = events['user_key'].map(reference)
+
+    flags = event_flags(events)
+    columns = {}
+    for window in windows:
+        inside = (days <= reference) & (days > reference - pd.Timedelta(days=window))
+        grouped = events[inside].groupby('user_key')
+        columns[f'total_watch_time_{window}d'] = grouped['content_time_spent'].sum().reindex(users, fill_value=0)
+        columns[f'unique_programs_{window}d'] = grouped['programme'].nunique().reindex(users, fill_value=0)
+        columns[f'day_watching_{window}d'] = days[inside].groupby(events.loc[inside, 'user_key']).nunique().reindex(
+            users, fill_value=0)
+        rates = flags[inside].groupby(events.loc[inside, 'user_key']).mean().reindex(users) * 100
+        for name in flags.columns:
+            columns[f'{name}_{window}d'] = rates[name]
+    return pd.DataFrame(columns, index=users)
+
+
+def _with_missing_dates(events):
+    events = events.copy()
+    events.loc[events.index[::97], 'date'] = pd.NaT
+    return events
+
+
+@pytest.mark.parametrize('as_of, anchor', [(None, None), ('2024-03-15', None), (None, 'cancelled_on')])
+def test_windowed_features_match_brute_force(events, as_of, anchor):
+    events = _with_missing_dates(events)
+    result = compute_windowed_features(events, windows=WINDOWS, as_of=as_of, anchor=anchor)
+    expected = _brute_force(events, WINDOWS, as_of=as_of, anchor=anchor)
+    assert sorted(result.columns) == sorted(expected.columns)
+    assert all(is_window_column(col) for col in result.columns)
+    pd.testing.assert_frame_equal(result, expected[result.columns], check_dtype=False)
+
+
+def test_unparseable_as_of(events):
+    with pytest.raises(ValueError, match='as_of'):
+        compute_windowed_features(events, as_of='not a date')
@@ -0,0 +1,19 @@
+"""ICI TOU.TV user segmentation pipeline.
+
+The pipeline runs in three stages, each a module with a ``run_*`` function
+and a subcommand of the command-line interface (``python -m toutv_segmentation``):
+
+- ``preprocess``: load ``abo.csv``, ``visionnements.csv`` and ``cms.csv``,
+  profile them, merge them and compute the user-level features (``df.csv``);
+- ``variables``: select, filter and aggregate the segmentation variables
+  (``df_segmented.csv``);
+- ``segment``: cluster each subscription group (``df_clusters.csv``);
+
+plus ``report``, which prints the data-quality reports and the cluster profiles.
+
+Importing the package is cheap: modelling libraries are imported by the
+functions that use them, and plotting libraries (``toutv_segmentation.plots``)
+only when figures are requested.
+"""
+
+__version__ = '0.1.0'
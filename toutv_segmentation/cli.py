@@ -0,0 +1,161 @@
+"""Command-line interface: ``python -m toutv_segmentation <stage> [options]``.
+
+Stages are imported only when their subcommand runs, and plotting libraries
+only with ``--plots DIR``, in which case figures are rendered without a display
+(``MPLBACKEND=Agg``) and saved as PNG files. Runs are headless by default so the
+stages can be called from a scheduler.
+"""
+
+import argparse
+import os
+import time
+
+
+def _figures(args):
+    if not args.plots:
+        return None
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    try:
+        from .plots import Figures
+    except ImportError as exc:
+        raise SystemExit(f"--plots needs the plotting libraries (pip install '.[plots]'): {exc}")
+    return Figures(args.plots)
+
+
+def _preprocess(args):
+    from .preprocess import run_preprocess
+
+    run_preprocess(data_dir=args.data_dir, output=args.output, quality_dir=args.quality_dir,
+                   n_jobs=args.jobs, windows=args.windows, as_of=args.as_of,
+                   window_anchor=args.window_anchor, figures=_figures(args))
+
+
+def _variables(args):
+    from .variables import run_variables
+
+    run_variables(input=args.input, output=args.output, figures=_figures(args))
+
+
+def _segment(args):
+    from .segment import run_segment
+
+    k_values = {'Abonnement = 1': args.k1, 'Abonnement = 0': args.k0}
+    run_segment(input=args.input, output=args.output, feature_store_dir=args.feature_store,
+                k_values=k_values, reduce=args.pca, reduce_method=args.pca_method,
+                compress=args.compress, quantize=args.quantize, evaluate=args.evaluate, stability=args.stability,
+                n_replicates=args.replicates, n_jobs=args.jobs, figures=_figures(args))
+
+
+def _lookalike(args):
+    from .neighbors import run_lookalike
+
+    run_lookalike(input=args.input, output=args.output, index_dir=args.feature_store, k=args.k,
+                  rebuild=args.rebuild, benchmark=args.benchmark, n_jobs=args.jobs)
+
+
+def _coviewing(args):
+    from .coviewing import run_coviewing
+
+    run_coviewing(events=args.input, labels=args.labels, by=args.by, catalogue=args.catalogue,
+                  store_dir=args.feature_store, top=args.top, metric=args.metric,
+                  min_coviewers=args.min_coviewers)
+
+
+def _report(args):
+    from .report import run_report
+
+    run_report(quality_dir=args.quality_dir, clusters=args.clusters)
+
+
+def _components(value):
+    # "5" -> 5 components, "0.9" -> keep 90% of the variance
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError("must be positive")
+    if number >= 1 and not number.is_integer():
+        raise argparse.ArgumentTypeError("must be a whole number of components, or a fraction of variance below 1")
+    return number if number < 1 else int(number)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='toutv_segmentation', description="ICI TOU.TV user segmentation pipeline.")
+    subparsers = parser.add_subparsers(dest='stage', required=True)
+
+    def add_stage(name, handler, help):
+        stage = subparsers.add_parser(name, help=help, description=help)
+        stage.set_defaults(handler=handler)
+        return stage
+
+    def add_plots(stage):
+        stage.add_argument('--plots', metavar='DIR', help="save the figures as PNG files in DIR (default: no plots)")
+
+    stage = add_stage('preprocess', _preprocess, "Profile and merge the input CSVs and compute the user features.")
+    stage.add_argument('--data-dir', default='.', help="directory of abo.csv, visionnements.csv and cms.csv")
+    stage.add_argument('--output', default='df.csv')
+    stage.add_argument('--quality-dir', default='data_quality', help="where the data-quality reports are written")
+    stage.add_argument('--jobs', type=int, default=None, help="worker processes for the user features (default: all CPUs)")
+    stage.add_argument('--windows', type=int, nargs='+', metavar='DAYS', default=None,
+                       help="add last-N-day user features for each N (e.g. --windows 7 30 90)")
+    stage.add_argument('--as-of', metavar='DATE', default=None,
+                       help="last day of the windows (default: the last viewing day)")
+    stage.add_argument('--window-anchor', choices=['cancelled_on'], default=None,
+                       help="end each user's windows on their cancellation date instead (as-of date if none)")
+    add_plots(stage)
+
+    stage = add_stage('variables', _variables, "Select and aggregate the segmentation variables.")
+    stage.add_argument('--input', default='df.csv')
+    stage.add_argument('--output', default='df_segmented.csv')
+    add_plots(stage)
+
+    stage = add_stage('segment', _segment, "Cluster the former subscribers and the free users.")
+    stage.add_argument('--input', default='df_segmented.csv')
+    stage.add_argument('--output', default='df_clusters.csv')
+    stage.add_argument('--feature-store', default='feature_store', help="directory of the scaled group matrices")
+    stage.add_argument('--k1', type=int, default=3, help="clusters for former subscribers (abonnement = 1)")
+    stage.add_argument('--k0', type=int, default=2, help="clusters for free users (abonnement = 0)")
+    stage.add_argument('--pca', type=_components, metavar='N', default=None,
+                       help="cluster on a PCA of all variables: N components, or the fraction of variance if N < 1")
+    stage.add_argument('--pca-method', choices=['incremental', 'randomized'], default='incremental')
+    stage.add_argument('--compress', action='store_true',
+                       help="fit on the unique feature vectors weighted by their number of users")
+    stage.add_argument('--quantize', type=float, metavar='STEP', default=None,
+                       help="round standardized values to multiples of STEP before compressing (implies --compress)")
+    stage.add_argument('--evaluate', action='store_true', help="print elbow, silhouette and BIC scores for k = 2..6")
+    stage.add_argument('--stability', action='store_true', help="run the subsample stability analysis")
+    stage.add_argument('--replicates', type=int, default=50, help="subsamples per (group, k) for --stability")
+    stage.add_argument('--jobs', type=int, default=None, help="worker processes for --stability (default: all CPUs)")
+    add_plots(stage)
+
+    stage = add_stage('lookalike', _lookalike, "Find the former subscribers most similar to each free user.")
+    stage.add_argument('--input', default='df_segmented.csv')
+    stage.add_argument('--output', default='lookalikes.csv')
+    stage.add_argument('--feature-store', default='feature_store', help="directory of the persisted index")
+    stage.add_argument('-k', type=int, default=10, help="lookalikes per free user")
+    stage.add_argument('--rebuild', action='store_true', help="rebuild the index instead of updating it")
+    stage.add_argument('--benchmark', action='store_true', help="print the query latency per batch size")
+    stage.add_argument('--jobs', type=int, default=None, help="query threads (default: all CPUs)")
+
+    stage = add_stage('coviewing', _coviewing, "Programme co-viewing affinity and engagement per segment.")
+    stage.add_argument('--input', default='df.csv', help="viewing events with user_key, programme and content_time_spent")
+    stage.add_argument('--labels', default='df_clusters.csv', help="user-level file with the --by columns")
+    stage.add_argument('--by', nargs='+', default=['abonnement'], help="columns defining the segments (e.g. abonnement cluster)")
+    stage.add_argument('--catalogue', default='cms.csv', help="cms.csv for the programme theme and audience")
+    stage.add_argument('--feature-store', default='feature_store', help="where the user x programme matrix is stored")
+    stage.add_argument('--top', type=int, default=10, help="related programmes kept per programme")
+    stage.add_argument('--metric', choices=['coviewers', 'jaccard', 'lift', 'cosine'], default='lift')
+    stage.add_argument('--min-coviewers', type=int, default=2, help="drop programme pairs with fewer common viewers")
+
+    stage = add_stage('report', _report, "Print the data-quality overview and the cluster profiles.")
+    stage.add_argument('--quality-dir', default='data_quality')
+    stage.add_argument('--clusters', default='df_clusters.csv')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    start = time.perf_counter()
+    args.handler(args)
+    print(f"\n'{args.stage}' finished in {time.perf_counter() - start:.1f}s")
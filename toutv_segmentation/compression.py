@@ -0,0 +1,244 @@
+"""Collapse duplicate feature rows into weighted unique vectors for clustering.
+
+The segmentation features are small integers (``num_devices``,
+``unique_programs``, ``subscription_duration`` capped at 365 for actives), so
+many users share the same standardized vector. ``compress_rows`` keeps each
+distinct row once with its multiplicity; models are then fitted on the unique
+vectors with those weights and the labels expanded back to users, so the cost
+follows the number of distinct rows instead of the number of users.
+
+On exact duplicates the weighted fits optimize the same objective as on the
+full matrix:
+
+- K-Means: scikit-learn ``sample_weight``;
+- silhouette: ``weighted_silhouette_score`` equals ``silhouette_score`` on the
+  expanded rows;
+- GMM: ``WeightedGaussianMixture``, an EM with weighted responsibilities
+  (``GaussianMixture`` has no ``sample_weight``);
+- Ward linkage: ``weighted_ward_linkage`` starts from clusters of the given
+  sizes, duplicates being merged at height 0 beforehand.
+
+``quantize`` rounds the (standardized) values to a grid first, which also
+collapses near-identical rows, e.g. on PCA projections.
+"""
+
+import numpy as np
+from scipy.special import logsumexp
+
+
+class CompressedMatrix:
+    """Unique rows of a matrix, their multiplicities and the row -> unique mapping."""
+
+    def __init__(self, vectors, weights, inverse):
+        self.vectors = vectors
+        self.weights = weights
+        self.inverse = inverse
+
+    @property
+    def n_rows(self):
+        return len(self.inverse)
+
+    @property
+    def n_unique(self):
+        return len(self.vectors)
+
+    @property
+    def ratio(self):
+        """Rows per unique vector (the duplication rate)."""
+        return self.n_rows / max(self.n_unique, 1)
+
+    def expand(self, values):
+        """Map per-vector values (e.g. cluster labels) back to the original rows."""
+        return np.asarray(values)[self.inverse]
+
+
+def compress_rows(data, quantize=None):
+    """Deduplicate the rows of ``data``, optionally rounded to multiples of ``quantize``."""
+    values = np.asarray(data, dtype=np.float32)
+    if quantize:
+        values = (np.round(values / quantize) * quantize).astype(np.float32)
+    vectors, inverse, counts = np.unique(values, axis=0, return_inverse=True, return_counts=True)
+    return CompressedMatrix(vectors, counts.astype(np.int64), inverse.reshape(-1))
+
+
+##### Weighted scores
+
+def weighted_silhouette_score(vectors, labels, weights, block_elements=2**24):
+    """Mean silhouette of the expanded rows, computed on the unique vectors.
+
+    Distance sums to each cluster are weighted by multiplicity (duplicates of a
+    row count in its cluster size at distance 0). Distances are computed in row
+    blocks of about ``block_elements`` entries.
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    labels = np.asarray(labels)
+    weights = np.asarray(weights, dtype=np.float64)
+    clusters, codes = np.unique(labels, return_inverse=True)
+    membership = np.zeros((len(vectors), len(clusters)))
+    membership[np.arange(len(vectors)), codes] = weights
+    sizes = membership.sum(axis=0)
+
+    squared_norms = (vectors ** 2).sum(axis=1)
+    block = max(block_elements // max(len(vectors), 1), 1)
+    scores = np.empty(len(vectors))
+    for start in range(0, len(vectors), block):
+        rows = slice(start, start + block)
+        squared = squared_norms[rows, None] - 2 * vectors[rows] @ vectors.T + squared_norms[None, :]
+        sums = np.sqrt(np.maximum(squared, 0)) @ membership
+        own = codes[rows]
+        index = np.arange(len(own))
+        own_size = sizes[own]
+        intra = sums[index, own] / np.maximum(own_size - 1, 1)
+        sums[index, own] = np.inf
+        inter = (sums / sizes).min(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            score = (inter - intra) / np.maximum(intra, inter)
+        scores[rows] = np.where(own_size > 1, np.nan_to_num(score), 0.0)
+    return float(np.average(scores, weights=weights))
+
+
+class WeightedGaussianMixture:
+    """Full-covariance Gaussian mixture fitted by EM with sample weights.
+
+    Mirrors ``sklearn.mixture.GaussianMixture`` (K-Means initialization,
+    ``reg_covar``, ``tol`` on the mean log-likelihood, same BIC) with each
+    responsibility multiplied by the row weight in the M-step.
+    """
+
+    def __init__(self, n_components, max_iter=100, tol=1e-3, reg_covar=1e-6, random_state=None):
+        self.n_components = n_components
+        self.max_iter = max_iter
+        self.tol = tol
+        self.reg_covar = reg_covar
+        self.random_state = random_state
+
+    def _m_step(self, X, weighted_resp):
+        nk = weighted_resp.sum(axis=0) + 10 * np.finfo(np.float64).eps
+        self.weights_ = nk / nk.sum()
+        self.means_ = weighted_resp.T @ X / nk[:, None]
+        self.covariances_ = np.empty((self.n_components, X.shape[1], X.shape[1]))
+        for k in range(self.n_components):
+            diff = X - self.means_[k]
+            self.covariances_[k] = (weighted_resp[:, k, None] * diff).T @ diff / nk[k]
+            self.covariances_[k].flat[::X.shape[1] + 1] += self.reg_covar
+
+    def _log_prob(self, X):
+        # log(pi_k) + log N(x | mean_k, cov_k) for every row and component
+        log_prob = np.empty((len(X), self.n_components))
+        for k in range(self.n_components):
+            cholesky = np.linalg.cholesky(self.covariances_[k])
+            solved = np.linalg.solve(cholesky, (X - self.means_[k]).T)
+            log_det = 2 * np.log(np.diag(cholesky)).sum()
+            log_prob[:, k] = -0.5 * (X.shape[1] * np.log(2 * np.pi) + log_det + (solved ** 2).sum(axis=0))
+        return log_prob + np.log(self.weights_)
+
+    def fit(self, X, sample_weight=None):
+        from sklearn.cluster import KMeans
+
+        X = np.asarray(X, dtype=np.float64)
+        weights = np.ones(len(X)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        labels = KMeans(n_clusters=self.n_components, n_init=1, random_state=self.random_state).fit(
+            X, sample_weight=weights).labels_
+        resp = np.zeros((len(X), self.n_components))
+        resp[np.arange(len(X)), labels] = 1.0
+
+        lower_bound = -np.inf
+        self.converged_ = False
+        for self.n_iter_ in range(1, self.max_iter + 1):
+            self._m_step(X, resp * weights[:, None])
+            log_prob = self._log_prob(X)
+            log_norm = logsumexp(log_prob, axis=1)
+            resp = np.exp(log_prob - log_norm[:, None])
+            previous, lower_bound = lower_bound, np.average(log_norm, weights=weights)
+            if abs(lower_bound - previous) < self.tol:
+                self.converged_ = True
+                break
+        self._m_step(X, resp * weights[:, None])
+        return self
+
+    def score_samples(self, X):
+        return logsumexp(self._log_prob(np.asarray(X, dtype=np.float64)), axis=1)
+
+    def predict(self, X):
+        return self._log_prob(np.asarray(X, dtype=np.float64)).argmax(axis=1)
+
+    def _n_parameters(self):
+        n_features = self.means_.shape[1]
+        return int(self.n_components * (n_features + n_features * (n_features + 1) / 2) + self.n_components - 1)
+
+    def bic(self, X, sample_weight=None):
+        """BIC of the weighted rows, i.e. of the expanded matrix."""
+        log_likelihood = self.score_samples(X)
+        weights = np.ones(len(log_likelihood)) if sample_weight is None else np.asarray(sample_weight, dtype=np.float64)
+        return -2 * (weights * log_likelihood).sum() + self._n_parameters() * np.log(weights.sum())
+
+
+##### Weighted linkage
+
+def weighted_ward_linkage(vectors, weights):
+    """Ward linkage of unique vectors standing for ``weights`` rows each.
+
+    Nearest-neighbour chain with Lance-Williams updates, starting from
+    clusters of the given sizes (the heights are those of
+    ``scipy.cluster.hierarchy.linkage(method='ward')`` on the expanded rows,
+    minus the zero-height merges of duplicates). Returns a scipy linkage matrix
+    over the unique vectors. Memory is quadratic in their number.
+    """
+    vectors = np.asarray(vectors, dtype=np.float64)
+    n = len(vectors)
+    sizes = np.asarray(weights, dtype=np.float64).copy()
+    squared_norms = (vectors ** 2).sum(axis=1)
+    distances = np.maximum(squared_norms[:, None] - 2 * vectors @ vectors.T + squared_norms[None, :], 0)
+    # Squared Ward distance between clusters of sizes n_i and n_j
+    distances *= 2 * sizes[:, None] * sizes[None, :] / (sizes[:, None] + sizes[None, :])
+    np.fill_diagonal(distances, np.inf)
+
+    active = np.ones(n, dtype=bool)
+    cluster_ids = np.arange(n)
+    leaves = np.ones(n, dtype=np.int64)
+    merges = []
+    chain = []
+    while len(merges) < n - 1:
+        if not chain:
+            chain.append(int(np.flatnonzero(active)[0]))
+        current = chain[-1]
+        row = np.where(active, distances[current], np.inf)
+        nearest = int(row.argmin())
+        if len(chain) > 1 and row[chain[-2]] <= row[nearest]:
+            nearest = chain[-2]
+        if len(chain) < 2 or nearest != chain[-2]:
+            chain.append(nearest)
+            continue
+
+        # Reciprocal nearest neighbours: merge them into ``current``
+        chain = chain[:-2]
+        other = nearest
+        merged = sizes[current] + sizes[other]
+        leaves[current] += leaves[other]
+        merges.append([cluster_ids[current], cluster_ids[other], np.sqrt(distances[current, other]), leaves[current]])
+        updated = ((sizes + sizes[current]) * distances[current]
+                   + (sizes + sizes[other]) * distances[other]
+                   - sizes * distances[current, other]) / (sizes + merged)
+        active[other] = False
+        distances[current], distances[:, current] = updated, updated
+        distances[other], distances[:, other] = np.inf, np.inf
+        distances[current, current] = np.inf
+        sizes[current] = merged
+        cluster_ids[current] = n + len(merges) - 1
+
+    merges = np.array(merges, dtype=np.float64).reshape(-1, 4)
+    # scipy expects merges by increasing height and the smaller id first
+    order = np.argsort(merges[:, 2], kind='stable')
+    return _relabel(merges[order], order, n)
+
+
+def _relabel(merges, order, n):
+    # Cluster ids refer to the merge position; renumber them after sorting
+    position = np.empty(len(order), dtype=np.int64)
+    position[order] = np.arange(len(order))
+    for row in merges:
+        for column in (0, 1):
+            if row[column] >= n:
+                row[column] = n + position[int(row[column]) - n]
+        row[:2] = np.sort(row[:2])
+    return merges
@@ -0,0 +1,239 @@
+"""Sparse user x programme matrix, programme co-viewing and engagement.
+
+``build_user_programme_matrix`` turns viewing events into two CSR matrices
+(one row per ``user_key``, one column per ``programme``) straight from integer
+codes: the number of viewing events and the total ``content_time_spent``.
+Everything downstream stays sparse, so the cost follows the number of
+(user, programme) pairs, not users x catalogue:
+
+- ``coviewing``: programme x programme counts of users who watched both,
+  ``B.T @ B`` on the binarized matrix, optionally restricted to a subset of
+  users (a segment, an ``abonnement`` group);
+- ``programme_affinity``: the top related programmes of each programme by
+  co-viewers, Jaccard index, lift or cosine similarity;
+- ``programme_engagement``: viewers, events and watch time per programme and
+  per group, via a sparse group-indicator product.
+
+Matrices are stored under ``<root>/<name>/`` (``counts.npz``,
+``watch_time.npz``, ``users.npy``, ``programmes.json``).
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+COUNTS_FILE = 'counts.npz'
+WATCH_TIME_FILE = 'watch_time.npz'
+USERS_FILE = 'users.npy'
+PROGRAMMES_FILE = 'programmes.json'
+AFFINITY_METRICS = ['coviewers', 'jaccard', 'lift', 'cosine']
+
+
+class UserProgrammeMatrix:
+    """Event counts and watch time per (user, programme), as CSR matrices."""
+
+    def __init__(self, counts, watch_time, users, programmes):
+        self.counts = counts
+        self.watch_time = watch_time
+        self.users = pd.Index(users, name='user_key')
+        self.programmes = pd.Index(programmes, name='programme')
+
+    @property
+    def shape(self):
+        return self.counts.shape
+
+    def __len__(self):
+        return self.counts.shape[0]
+
+    def viewed(self):
+        """Binary user x programme matrix (1 when the user watched the programme)."""
+        viewed = self.counts.copy()
+        viewed.data = np.ones_like(viewed.data, dtype=np.int32)
+        return viewed
+
+    def rows(self, keys):
+        """Row positions of ``keys`` (unknown keys are skipped)."""
+        positions = self.users.get_indexer(pd.Index(keys))
+        return positions[positions >= 0]
+
+
+def build_user_programme_matrix(events, user_col='user_key', programme_col='programme',
+                                weight_col='content_time_spent'):
+    """Build the CSR matrices of ``events`` (duplicate pairs are summed)."""
+    valid = events[user_col].notna() & events[programme_col].notna()
+    events = events.loc[valid]
+    user_codes, users = pd.factorize(events[user_col], sort=True)
+    programme_codes, programmes = pd.factorize(events[programme_col], sort=True)
+    shape = (len(users), len(programmes))
+
+    counts = sparse.csr_matrix((np.ones(len(events), dtype=np.int32), (user_codes, programme_codes)), shape=shape)
+    weights = events[weight_col].fillna(0).clip(lower=0).to_numpy(dtype=np.float32)
+    watch_time = sparse.csr_matrix((weights, (user_codes, programme_codes)), shape=shape)
+    return UserProgrammeMatrix(counts, watch_time, users, programmes)
+
+
+def write_user_programme_matrix(matrix, root, name='user_programme'):
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+    sparse.save_npz(os.path.join(path, COUNTS_FILE), matrix.counts)
+    sparse.save_npz(os.path.join(path, WATCH_TIME_FILE), matrix.watch_time)
+    np.save(os.path.join(path, USERS_FILE), np.asarray(matrix.users).astype(str).astype('S'))
+    with open(os.path.join(path, PROGRAMMES_FILE), 'w') as f:
+        json.dump([str(p) for p in matrix.programmes], f, ensure_ascii=False)
+    return matrix
+
+
+def open_user_programme_matrix(root, name='user_programme'):
+    path = os.path.join(root, name)
+    with open(os.path.join(path, PROGRAMMES_FILE)) as f:
+        programmes = json.load(f)
+    users = np.char.decode(np.load(os.path.join(path, USERS_FILE)), 'utf-8')
+    return UserProgrammeMatrix(sparse.load_npz(os.path.join(path, COUNTS_FILE)).tocsr(),
+                               sparse.load_npz(os.path.join(path, WATCH_TIME_FILE)).tocsr(),
+                               users, programmes)
+
+
+##### Co-viewing
+
+class CoViewing:
+    """Programme x programme co-viewer counts (zero diagonal) and viewers per programme."""
+
+    def __init__(self, coviewers, viewers, n_users, programmes):
+        self.coviewers = coviewers
+        self.viewers = viewers
+        self.n_users = n_users
+        self.programmes = programmes
+
+
+def coviewing(matrix, rows=None, min_coviewers=1):
+    """Count the users who watched each pair of programmes.
+
+    ``rows`` restricts the computation to those user positions (e.g. one
+    segment). Pairs with fewer than ``min_coviewers`` users are dropped.
+    """
+    viewed = matrix.viewed()
+    if rows is not None:
+        viewed = viewed[rows]
+    coviewers = (viewed.T @ viewed).tocsr()
+    viewers = coviewers.diagonal()
+    coviewers.setdiag(0)
+    if min_coviewers > 1:
+        coviewers.data[coviewers.data < min_coviewers] = 0
+    coviewers.eliminate_zeros()
+    return CoViewing(coviewers, viewers, viewed.shape[0], matrix.programmes)
+
+
+def programme_affinity(cov, top=10, metric='lift'):
+    """Top ``top`` related programmes of each programme, ranked by ``metric``.
+
+    Metrics per pair (i, j): ``coviewers`` (users who watched both),
+    ``jaccard`` (coviewers / users who watched either), ``lift``
+    (coviewers x users / (viewers_i x viewers_j)) and ``cosine``
+    (coviewers / sqrt(viewers_i x viewers_j)).
+    """
+    if metric not in AFFINITY_METRICS:
+        raise ValueError(f"Unknown metric {metric!r}, expected one of {AFFINITY_METRICS}")
+    pairs = cov.coviewers.tocoo()
+    both = pairs.data.astype(np.float64)
+    viewers_i = cov.viewers[pairs.row].astype(np.float64)
+    viewers_j = cov.viewers[pairs.col].astype(np.float64)
+    table = pd.DataFrame({
+        'programme': cov.programmes[pairs.row],
+        'related_programme': cov.programmes[pairs.col],
+        'coviewers': pairs.data,
+        'jaccard': both / (viewers_i + viewers_j - both),
+        'lift': both * cov.n_users / (viewers_i * viewers_j),
+        'cosine': both / np.sqrt(viewers_i * viewers_j),
+    })
+    order = np.lexsort((-table[metric].to_numpy(), pairs.row))
+    table = table.iloc[order]
+    table['rank'] = table.groupby('programme', sort=False).cumcount() + 1
+    return table[table['rank'] <= top].reset_index(drop=True)
+
+
+def coviewing_by(matrix, labels, min_coviewers=1):
+    """``coviewing`` restricted to each group of ``labels`` (a Series indexed by ``user_key``)."""
+    labels = labels.reindex(matrix.users)
+    codes, groups = pd.factorize(labels)
+    return {group: coviewing(matrix, np.flatnonzero(codes == code), min_coviewers)
+            for code, group in enumerate(groups)}
+
+
+##### Engagement
+
+def programme_engagement(matrix, labels=None, catalogue=None):
+    """Viewers, events and watch time per programme (and per group of ``labels``).
+
+    ``labels`` is a Series indexed by ``user_key``; users without a label are
+    left out. Aggregates come from one sparse product of a group x user
+    indicator with each user x programme matrix, and only (group, programme)
+    pairs with viewers are returned. ``catalogue`` (``cms`` indexed by
+    ``emission``) adds the programme theme and audience.
+    """
+    if labels is None:
+        codes, groups = np.zeros(len(matrix), dtype=np.intp), pd.Index(['all'])
+    else:
+        codes, groups = pd.factorize(labels.reindex(matrix.users))
+    users = np.flatnonzero(codes >= 0)
+    indicator = sparse.csr_matrix((np.ones(len(users), dtype=np.int32), (codes[users], users)),
+                                  shape=(len(groups), len(matrix)))
+
+    viewers = (indicator @ matrix.viewed()).tocoo()
+    events = (indicator @ matrix.counts).tocsr()
+    watch_time = (indicator @ matrix.watch_time).tocsr()
+    group_users = np.bincount(codes[users], minlength=len(groups))
+
+    engagement = pd.DataFrame({
+        'group': groups[viewers.row],
+        'programme': matrix.programmes[viewers.col],
+        'viewers': viewers.data,
+        'viewer_share': viewers.data / group_users[viewers.row] * 100,
+        'events': np.asarray(events[viewers.row, viewers.col]).ravel(),
+        'watch_time': np.asarray(watch_time[viewers.row, viewers.col]).ravel(),
+    })
+    engagement['watch_time_per_viewer'] = engagement['watch_time'] / engagement['viewers']
+    engagement = engagement.sort_values(['group', 'viewers'], ascending=[True, False], ignore_index=True)
+    if catalogue is not None:
+        engagement = engagement.merge(catalogue[['theme', 'audience']], how='left',
+                                      left_on='programme', right_index=True)
+    return engagement
+
+
+##### Stage
+
+def _group_labels(labels_path, by):
+    # One label per user_key, e.g. "abonnement=1|cluster=2.0"
+    users = pd.read_csv(labels_path, usecols=['user_key'] + list(by)).drop_duplicates('user_key')
+    users = users.dropna(subset=list(by)).set_index('user_key')
+    return users[list(by)].astype(str).apply(
+        lambda row: '|'.join(f'{col}={value}' for col, value in row.items()), axis=1)
+
+
+def run_coviewing(events='df.csv', labels='df_clusters.csv', by=('abonnement',), catalogue='cms.csv',
+                  store_dir='feature_store', top=10, metric='lift', min_coviewers=2,
+                  affinity_output='programme_affinity.csv', engagement_output='programme_engagement.csv'):
+    """Build the user x programme matrix and write programme affinity and engagement per group."""
+    viewing = pd.read_csv(events, usecols=['user_key', 'programme', 'content_time_spent'])
+    matrix = write_user_programme_matrix(build_user_programme_matrix(viewing), store_dir)
+    print(f"\n User x programme matrix: {matrix.shape[0]} users x {matrix.shape[1]} programmes, "
+          f"{matrix.counts.nnz} non-zero pairs ({matrix.counts.nnz / max(np.prod(matrix.shape), 1):.2%} dense)")
+
+    group_labels = _group_labels(labels, by)
+    tables = []
+    for group, cov in coviewing_by(matrix, group_labels, min_coviewers).items():
+        table = programme_affinity(cov, top=top, metric=metric)
+        table.insert(0, 'group', group)
+        tables.append(table)
+        print(f" {group}: {cov.n_users} users, {cov.coviewers.nnz} co-viewed programme pairs")
+    affinity = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+    affinity.to_csv(affinity_output, index=False)
+
+    cms = pd.read_csv(catalogue).drop_duplicates('emission').set_index('emission') if os.path.exists(catalogue) else None
+    engagement = programme_engagement(matrix, group_labels, cms)
+    engagement.to_csv(engagement_output, index=False)
+    print(f"\n Programme affinity saved as '{affinity_output}', engagement as '{engagement_output}'.")
+    return affinity, engagement
@@ -0,0 +1,214 @@
+"""Single-pass data-quality profiling with a diffable report.
+
+``DataQualityProfiler`` is fed a table chunk by chunk and, in that one pass,
+collects:
+
+- null counts and percentages per column, overall and per value of each
+  ``null_by`` key (built on ``summary_statistics.SummaryStatistics``);
+- duplicate statistics for each ``keys`` column (rows, distinct values,
+  duplicated rows, nulls);
+- regex validity checks in ``patterns``, evaluated once per distinct value;
+- conditional describes (``describe_when``) and conditional group counts
+  (``count_when``), each restricted to the rows matching a condition.
+
+``report()`` returns a plain, JSON-serializable dict. Reports written with
+``write_report`` can be compared between runs with ``diff_reports``.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from .summary_statistics import ColumnSummary, SummaryStatistics, iter_frame_chunks
+
+
+class DataQualityProfiler:
+    """Accumulate data-quality statistics for one table in a single pass.
+
+    ``describe_when`` maps a name to ``(condition, column)`` and ``count_when``
+    maps a name to ``(condition, keys)``, where ``condition`` is a function of a
+    chunk returning a boolean mask (``None`` keeps every row).
+
+    The quantile sketches are seeded with ``seed`` so that profiling the same
+    input twice gives the same report (and an empty ``diff_reports``).
+    """
+
+    def __init__(self, name, keys=(), null_by=(), patterns=None, describe_when=None,
+                 count_when=None, max_invalid_values=20, k=200, seed=0):
+        self.name = name
+        self.keys = list(keys)
+        self.patterns = dict(patterns or {})
+        self.describe_when = dict(describe_when or {})
+        self.count_when = dict(count_when or {})
+        self.max_invalid_values = max_invalid_values
+        self.rows = 0
+        self.nulls = SummaryStatistics(by=null_by, k=k, seed=seed)
+        self.key_counts = {col: pd.Series(dtype='int64') for col in self.keys}
+        self.invalid_rows = {col: 0 for col in self.patterns}
+        self.invalid_values = {col: set() for col in self.patterns}
+        self.describes = {name: ColumnSummary(k=k, seed=seed) for name in self.describe_when}
+        self.counts = {name: pd.Series(dtype='int64') for name in self.count_when}
+
+    def update(self, chunk):
+        """Add one DataFrame chunk to the profile."""
+        self.rows += len(chunk)
+        self.nulls.update(chunk)
+
+        for col in self.keys:
+            counts = chunk[col].value_counts(dropna=False)
+            self.key_counts[col] = self.key_counts[col].add(counts, fill_value=0)
+
+        for col, pattern in self.patterns.items():
+            codes, uniques = pd.factorize(chunk[col].astype(str))
+            valid = pd.Series(uniques).str.match(pattern, na=False).to_numpy()
+            invalid_codes = np.flatnonzero(~valid)
+            # Missing values get code -1 and are invalid, as in valid_rcid_mask
+            missing = int((codes < 0).sum())
+            self.invalid_rows[col] += int(np.isin(codes, invalid_codes).sum()) + missing
+            self.invalid_values[col].update(uniques[invalid_codes])
+            if missing:
+                self.invalid_values[col].add('nan')
+
+        for name, (condition, column) in self.describe_when.items():
+            self.describes[name].update(_select(chunk, condition)[column])
+
+        for name, (condition, keys) in self.count_when.items():
+            counts = _select(chunk, condition).groupby(list(keys)).size()
+            if not self.counts[name].empty:
+                counts = self.counts[name].add(counts, fill_value=0)
+            self.counts[name] = counts
+        return self
+
+    def report(self):
+        """Return the profile as a JSON-serializable dict."""
+        report = {
+            'table': self.name,
+            'rows': self.rows,
+            'columns': {
+                col: {'nulls': int(self.nulls.null_counts[col]),
+                      'null_percentage': _number(self.nulls.null_percentage()[col])}
+                for col in self.nulls.null_counts.index
+            },
+            'nulls_by': {
+                key: {str(group): {col: _number(value) for col, value in row.items()}
+                      for group, row in self.nulls.null_percentage_by(key).iterrows()}
+                for key in self.nulls.by
+            },
+            'keys': {},
+            'patterns': {},
+            'describe': {name: {stat: _number(value) for stat, value in summary.describe().items()}
+                         for name, summary in self.describes.items()},
+            'counts': {},
+        }
+
+        for col, counts in self.key_counts.items():
+            non_null = counts[counts.index.notna()]
+            report['keys'][col] = {
+                'rows': self.rows,
+                'unique': int(len(non_null)),
+                'duplicates': int(counts.sum() - len(counts)),
+                'nulls': int(counts[counts.index.isna()].sum()),
+            }
+
+        for col, pattern in self.patterns.items():
+            invalid = sorted(self.invalid_values[col])
+            report['patterns'][col] = {
+                'pattern': pattern,
+                'invalid_rows': self.invalid_rows[col],
+                'invalid_unique': len(invalid),
+                'invalid_values': invalid[:self.max_invalid_values],
+            }
+
+        for name, counts in self.counts.items():
+            total = counts.sum()
+            report['counts'][name] = {
+                _label(group): {'count': int(count), 'percentage': _number(count / total * 100)}
+                for group, count in counts.items()
+            }
+        return report
+
+
+def _select(chunk, condition):
+    return chunk if condition is None else chunk[condition(chunk)]
+
+
+def _label(group):
+    # Group keys as stable strings ("gratuit|False" for multi-key groups)
+    if isinstance(group, tuple):
+        return '|'.join(str(value) for value in group)
+    return str(group)
+
+
+def _number(value):
+    # JSON has no NaN: missing statistics are written as null
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+def profile_table(data, name, chunksize=1_000_000, **options):
+    """Profile a DataFrame or an iterable of DataFrame chunks and return the report."""
+    chunks = iter_frame_chunks(data, chunksize) if isinstance(data, pd.DataFrame) else data
+    profiler = DataQualityProfiler(name, **options)
+    for chunk in chunks:
+        profiler.update(chunk)
+    return profiler.report()
+
+
+##### Reports
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+
+
+def read_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def update_report(report, directory='data_quality'):
+    """Write ``report`` to ``directory/<table>.json`` and diff it with the previous run.
+
+    Returns the ``diff_reports`` table (empty on the first run).
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{report['table']}.json")
+    previous = read_report(path) if os.path.exists(path) else report
+    write_report(report, path)
+    return diff_reports(previous, report)
+
+
+def flatten_report(report, prefix=''):
+    """Flatten a nested report into ``{'a.b.c': value}``."""
+    flat = {}
+    for key, value in report.items():
+        path = f'{prefix}.{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten_report(value, path))
+        else:
+            flat[path] = value
+    return flat
+
+
+def diff_reports(old, new, tolerance=1e-9):
+    """Return the entries that differ between two reports.
+
+    Numbers are compared with an absolute ``tolerance``. The result has one
+    row per changed path with the ``old`` and ``new`` values (``None`` when
+    the entry exists in one report only).
+    """
+    old_flat, new_flat = flatten_report(old), flatten_report(new)
+    rows = []
+    for path in sorted(set(old_flat) | set(new_flat)):
+        before, after = old_flat.get(path), new_flat.get(path)
+        numbers = (isinstance(before, (int, float)) and isinstance(after, (int, float))
+                   and not isinstance(before, bool) and not isinstance(after, bool))
+        if numbers and abs(before - after) <= tolerance:
+            continue
+        if not numbers and before == after:
+            continue
+        rows.append({'path': path, 'old': before, 'new': after})
+    return pd.DataFrame(rows, columns=['path', 'old', 'new'])
@@ -0,0 +1,145 @@
+"""On-disk store of scaled per-group feature matrices.
+
+Each group (e.g. ``abonnement_1``) is written once as a float32 ``.npy`` file
+together with the row mapping back to ``df_segmented`` (original index and
+``rcid_hash``, or the resolved ``user_key`` for anonymous visitors) and the
+scaler parameters. Clustering, evaluation and embedding steps open the matrix
+memory-mapped and read-only, so several processes share the same pages through
+the OS cache instead of each holding a float64 copy.
+
+Layout::
+
+    <root>/<group>/matrix.npy     float32, n_rows x n_features (standardized)
+    <root>/<group>/index.npy      int64, row labels in the source DataFrame
+    <root>/<group>/rcid_hash.npy  fixed-width bytes, one ID per row
+    <root>/<group>/meta.json      features, scaler mean/scale, shape
+"""
+
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from .summary_statistics import StreamingMoments, iter_frame_chunks
+
+
+MATRIX_FILE = 'matrix.npy'
+INDEX_FILE = 'index.npy'
+IDS_FILE = 'rcid_hash.npy'
+META_FILE = 'meta.json'
+
+
+class FeatureMatrix:
+    """A read-only, memory-mapped feature matrix and its row/scaler metadata."""
+
+    def __init__(self, path, data, index, ids, meta):
+        self.path = path
+        self.data = data
+        self.index = index
+        self.ids = ids
+        self.meta = meta
+
+    @property
+    def features(self):
+        return self.meta['features']
+
+    @property
+    def mean(self):
+        return np.asarray(self.meta['mean'])
+
+    @property
+    def scale(self):
+        return np.asarray(self.meta['scale'])
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def rcid_hash(self):
+        """Return the row IDs decoded as strings."""
+        return np.char.decode(np.asarray(self.ids), 'utf-8')
+
+    def transform(self, values):
+        """Standardize raw feature values with the stored scaler."""
+        return ((np.asarray(values, dtype=np.float64) - self.mean) / self.scale).astype(np.float32)
+
+    def inverse_transform(self, values):
+        """Map standardized values (e.g. cluster centers) back to raw units."""
+        return np.asarray(values, dtype=np.float64) * self.scale + self.mean
+
+
+def write_feature_matrix(root, group, frame, ids, chunksize=100_000, standardize=True):
+    """Standardize ``frame`` and write it as a float32 memory-mapped matrix.
+
+    ``frame`` holds the raw numeric features of one group (its index is kept as
+    the row mapping) and ``ids`` the matching ``rcid_hash`` / ``user_key``
+    values. Mean and scale are computed like ``StandardScaler`` (population
+    standard deviation, zero-variance columns left unscaled) in one pass of
+    ``StreamingMoments`` over ``chunksize`` slices; rows are then scaled and
+    written chunk by chunk, so float64 copies never exceed one chunk. With
+    ``standardize=False`` (e.g. float32 PCA projections) chunks are written as
+    float32 without a float64 round trip.
+    """
+    path = os.path.join(root, group)
+    os.makedirs(path, exist_ok=True)
+
+    shape = frame.shape
+    if standardize:
+        moments = [StreamingMoments() for _ in range(shape[1])]
+        for chunk in iter_frame_chunks(frame, chunksize):
+            for column, summary in zip(chunk.to_numpy(dtype=np.float64).T, moments):
+                summary.update(column)
+        mean = np.array([m.mean if m.count else 0.0 for m in moments])
+        scale = np.array([m.std(ddof=0) if m.count else 1.0 for m in moments])
+        scale[~(scale > 0)] = 1.0
+    else:
+        mean = np.zeros(shape[1])
+        scale = np.ones(shape[1])
+
+    matrix = open_memmap(os.path.join(path, MATRIX_FILE), mode='w+', dtype=np.float32, shape=shape)
+    for start in range(0, shape[0], chunksize):
+        chunk = frame.iloc[start:start + chunksize]
+        if standardize:
+            matrix[start:start + len(chunk)] = (chunk.to_numpy(dtype=np.float64) - mean) / scale
+        else:
+            matrix[start:start + len(chunk)] = chunk.to_numpy(dtype=np.float32)
+    matrix.flush()
+    del matrix
+
+    np.save(os.path.join(path, INDEX_FILE), np.asarray(frame.index, dtype=np.int64))
+    np.save(os.path.join(path, IDS_FILE), np.asarray(ids).astype(str).astype('S'))
+
+    meta = {
+        'group': group,
+        'features': list(frame.columns),
+        'n_rows': int(shape[0]),
+        'dtype': 'float32',
+        'mean': mean.tolist(),
+        'scale': scale.tolist(),
+    }
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return open_feature_matrix(root, group)
+
+
+def open_feature_matrix(root, group, mode='r'):
+    """Open a stored group memory-mapped (read-only by default, no copy)."""
+    path = os.path.join(root, group)
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    data = np.load(os.path.join(path, MATRIX_FILE), mmap_mode=mode)
+    index = np.load(os.path.join(path, INDEX_FILE), mmap_mode='r')
+    ids = np.load(os.path.join(path, IDS_FILE), mmap_mode='r')
+    return FeatureMatrix(path, data, index, ids, meta)
+
+
+def list_groups(root):
+    """Return the names of the groups stored under ``root``."""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if os.path.isfile(os.path.join(root, name, META_FILE)))
@@ -0,0 +1,68 @@
+"""Resolve the user key used by every per-user aggregation.
+
+``rcid_hash`` is a hex hash for logged-in users, but anonymous traffic arrives
+as ``anonyme`` (and a few other non-hash placeholders). Grouping on the raw
+column turns all of that traffic into one giant "user" that dominates every
+``groupby('rcid_hash')`` and distorts the segments.
+
+``resolve_user_keys`` adds two columns:
+
+- ``user_key``: the ``rcid_hash`` when it is a valid hash, otherwise
+  ``visitor:<visitor_id_hash>`` so anonymous traffic is split per device;
+- ``identity_type``: ``rcid``, ``visitor``, or ``unresolved`` when neither ID
+  is usable (those rows keep their raw ``rcid_hash`` as key).
+
+``hot_keys`` finds keys that still hold an outsized share of the rows. The
+preprocessing stage prints them, and
+``user_features.compute_user_features_partitioned`` gives each one a shard of
+its own so one heavy key does not stall a worker.
+"""
+
+import pandas as pd
+
+
+HASH_PATTERN = r'^[a-fA-F0-9]+$'
+VISITOR_PREFIX = 'visitor:'
+MISSING_IDS = {'', 'nan', 'None', 'NaN', 'null'}
+
+
+def valid_rcid_mask(rcid_hash, pattern=HASH_PATTERN):
+    """Return a boolean mask of rows whose ``rcid_hash`` is a valid hash.
+
+    The regex runs once per distinct value rather than once per row.
+    """
+    codes, uniques = pd.factorize(rcid_hash.astype(str))
+    valid = pd.Series(uniques).str.match(pattern, na=False).to_numpy()
+    mask = valid[codes]
+    mask[codes < 0] = False
+    return pd.Series(mask, index=rcid_hash.index)
+
+
+def resolve_user_keys(df, rcid_col='rcid_hash', visitor_col='visitor_id_hash', pattern=HASH_PATTERN):
+    """Add ``user_key`` and ``identity_type`` columns to ``df`` (in place) and return it."""
+    rcid = df[rcid_col].astype(str)
+    visitor = df[visitor_col].astype(str)
+    is_rcid = valid_rcid_mask(rcid, pattern)
+    has_visitor = ~visitor.isin(MISSING_IDS) & df[visitor_col].notna()
+
+    df['user_key'] = rcid.where(is_rcid, VISITOR_PREFIX + visitor)
+    df.loc[~is_rcid & ~has_visitor, 'user_key'] = rcid[~is_rcid & ~has_visitor]
+    df['identity_type'] = 'unresolved'
+    df.loc[~is_rcid & has_visitor, 'identity_type'] = 'visitor'
+    df.loc[is_rcid, 'identity_type'] = 'rcid'
+    return df
+
+
+def hot_keys(keys, max_share=0.01, min_rows=10_000):
+    """Return the keys holding more than ``max_share`` of the rows (and at least ``min_rows``).
+
+    The result is a Series of row counts indexed by key, largest first.
+    """
+    counts = keys.value_counts()
+    threshold = max(max_share * len(keys), min_rows)
+    return counts[counts > threshold]
+
+
+def identity_summary(df):
+    """Rows and distinct keys per ``identity_type``."""
+    return df.groupby('identity_type').agg(rows=('user_key', 'size'), users=('user_key', 'nunique'))
@@ -0,0 +1,335 @@
+"""Nearest-neighbour index over scaled user vectors for lookalike queries.
+
+``NeighborIndex`` keeps users' standardized feature vectors in a KD-tree (or
+ball tree), keyed by ``user_key`` (the ``rcid_hash`` of logged-in users). The
+typical query is "the N former subscribers most similar to each free user":
+the index is built over the ``abonnement == 1`` group and queried with the
+``abonnement == 0`` users, both scaled with the index's own scaler so the two
+groups live in the same space.
+
+- Queries are batched and spread over threads (single-tree KD/ball-tree
+  queries release the GIL).
+- New users are inserted into a small brute-force "delta" buffer searched
+  alongside the tree; once the buffer exceeds ``rebuild_fraction`` of the tree
+  the tree is rebuilt with them, so inserts stay cheap and queries exact.
+  Re-adding an indexed user replaces its vector, and ``sync`` makes a reopened
+  index match the current feature table (new, changed and departed users).
+  Removing a user from the tree rebuilds it; the scaler is kept.
+- The index is persisted as ``<root>/<name>/`` (``tree.pkl``, ``ids.npy``,
+  ``delta.npy``, ``delta_ids.npy``, ``index.json``) and reopened with
+  ``open_index``.
+- ``benchmark_index`` reports the per-query latency and throughput for
+  several batch sizes. Tree and delta searches are exact, so there is no
+  recall/latency trade-off to measure.
+"""
+
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+# Lookalike space: behaviour variables defined for both subscription groups
+# (``subscription_duration`` is a constant 365 for free users)
+LOOKALIKE_FEATURES = ['num_devices', 'unique_programs', 'avg_watch_time']
+
+TREE_FILE = 'tree.pkl'
+IDS_FILE = 'ids.npy'
+DELTA_FILE = 'delta.npy'
+DELTA_IDS_FILE = 'delta_ids.npy'
+INDEX_FILE = 'index.json'
+
+
+def _make_tree(vectors, algorithm, leaf_size):
+    from sklearn.neighbors import BallTree, KDTree
+
+    if algorithm == 'kd_tree':
+        return KDTree(vectors, leaf_size=leaf_size)
+    if algorithm == 'ball_tree':
+        return BallTree(vectors, leaf_size=leaf_size)
+    raise ValueError(f"Unknown algorithm {algorithm!r}, expected 'kd_tree' or 'ball_tree'")
+
+
+def _as_ids(ids):
+    # ``user_key`` values as the fixed-width bytes stored in the index
+    return np.asarray(ids).astype(str).astype('S')
+
+
+def _brute_force(queries, vectors, k, block_elements=2 ** 24):
+    # k nearest ``vectors`` of each query, scanning ``vectors`` in blocks so the
+    # distance matrix never exceeds ``block_elements`` entries
+    k = min(k, len(vectors))
+    block = max(1, block_elements // max(len(queries), 1))
+    best_distances = np.empty((len(queries), 0))
+    best = np.empty((len(queries), 0), dtype=np.intp)
+    for start in range(0, len(vectors), block):
+        part = vectors[start:start + block]
+        sq = (np.einsum('ij,ij->i', queries, queries)[:, None] + np.einsum('ij,ij->i', part, part)[None, :]
+              - 2 * queries @ part.T)
+        n = min(k, len(part))
+        nearest = np.argpartition(sq, n - 1, axis=1)[:, :n] if n < len(part) else np.tile(np.arange(n), (len(queries), 1))
+        # Exact distances of the candidates (the expansion above loses precision near 0)
+        distances = np.linalg.norm(part[nearest] - queries[:, None, :], axis=2)
+        best_distances = np.hstack([best_distances, distances])
+        best = np.hstack([best, nearest + start])
+        order = np.argsort(best_distances, axis=1, kind='stable')[:, :k]
+        best_distances = np.take_along_axis(best_distances, order, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+    return best_distances, best
+
+
+class NeighborIndex:
+    """KD/ball tree of standardized vectors, a delta buffer of inserts and their ``user_key`` ids."""
+
+    def __init__(self, tree, ids, meta, delta=None, delta_ids=None, path=None):
+        self.tree = tree
+        self.ids = np.asarray(ids)
+        self.meta = meta
+        self.delta = np.empty((0, len(meta['features']))) if delta is None else delta
+        self.delta_ids = self.ids[:0] if delta_ids is None else np.asarray(delta_ids)
+        self.path = path
+
+    @property
+    def features(self):
+        return self.meta['features']
+
+    @property
+    def mean(self):
+        return np.asarray(self.meta['mean'])
+
+    @property
+    def scale(self):
+        return np.asarray(self.meta['scale'])
+
+    def __len__(self):
+        return len(self.ids) + len(self.delta_ids)
+
+    def transform(self, frame):
+        """Standardize the raw ``features`` of ``frame`` with the index scaler."""
+        values = frame[self.features].to_numpy(dtype=np.float64, na_value=np.nan)
+        values = (values - self.mean) / self.scale
+        values[~np.isfinite(values)] = 0.0
+        return values
+
+    ##### Inserts
+
+    def add(self, frame, ids):
+        """Insert or replace users (raw features in ``frame``) via the delta buffer.
+
+        Users already indexed are removed first, so their old vectors are
+        never returned. The tree is rebuilt with the buffer once it holds more
+        than ``rebuild_fraction`` of the indexed users.
+        """
+        ids = _as_ids(ids)
+        self.remove(ids)
+        self.delta = np.vstack([self.delta, self.transform(frame)])
+        self.delta_ids = np.concatenate([self.delta_ids, ids])
+        if len(self.delta_ids) > self.meta['rebuild_fraction'] * max(len(self.ids), 1):
+            self.rebuild()
+        return self
+
+    def remove(self, ids):
+        """Drop users from the index; the tree is rebuilt if it holds any of them."""
+        ids = _as_ids(ids)
+        in_delta = np.isin(self.delta_ids, ids)
+        self.delta, self.delta_ids = self.delta[~in_delta], self.delta_ids[~in_delta]
+        in_tree = np.isin(self.ids, ids)
+        if in_tree.any():
+            vectors = np.vstack([self.tree.get_arrays()[0][~in_tree], self.delta])
+            if not len(vectors):
+                raise ValueError("Cannot remove every indexed user")
+            self.tree = _make_tree(vectors, self.meta['algorithm'], self.meta['leaf_size'])
+            self.ids = np.concatenate([self.ids[~in_tree], self.delta_ids])
+            self.delta, self.delta_ids = self.delta[:0], self.delta_ids[:0]
+        return self
+
+    def sync(self, frame, ids):
+        """Make the index hold exactly the users of ``frame`` with their current features.
+
+        Users missing from ``frame`` are removed, new ones inserted and those
+        whose standardized vector changed replaced. Returns the numbers of
+        ``(added, updated, removed)`` users.
+        """
+        ids = _as_ids(ids)
+        vectors = self.transform(frame)
+        indexed_ids = np.concatenate([self.ids, self.delta_ids])
+        indexed = np.vstack([self.tree.get_arrays()[0], self.delta])
+        positions = pd.Index(indexed_ids).get_indexer(ids)
+        new = positions < 0
+        changed = ~new & np.any(indexed[positions] != vectors, axis=1)
+        gone = indexed_ids[~np.isin(indexed_ids, ids)]
+
+        if len(gone):
+            self.remove(gone)
+        if (new | changed).any():
+            self.add(frame[new | changed], ids[new | changed])
+        return int(new.sum()), int(changed.sum()), len(gone)
+
+    def rebuild(self):
+        """Rebuild the tree over the indexed users and the delta buffer."""
+        if len(self.delta_ids):
+            vectors = np.vstack([self.tree.get_arrays()[0], self.delta])
+            self.tree = _make_tree(vectors, self.meta['algorithm'], self.meta['leaf_size'])
+            self.ids = np.concatenate([self.ids, self.delta_ids])
+            self.delta, self.delta_ids = self.delta[:0], self.delta_ids[:0]
+        return self
+
+    ##### Queries
+
+    def _query_batch(self, vectors, k):
+        distances, positions = self.tree.query(vectors, k=min(k, len(self.ids)))
+        ids = self.ids[positions]
+        if len(self.delta_ids):
+            delta_distances, delta_positions = _brute_force(vectors, self.delta, k)
+            distances = np.hstack([distances, delta_distances])
+            ids = np.hstack([ids, self.delta_ids[delta_positions]])
+            order = np.argsort(distances, axis=1, kind='stable')[:, :k]
+            distances = np.take_along_axis(distances, order, axis=1)
+            ids = np.take_along_axis(ids, order, axis=1)
+        return distances, ids
+
+    def query_vectors(self, vectors, k=10, batch_size=10_000, n_jobs=None):
+        """Return ``(distances, ids)`` of the ``k`` nearest users of each standardized vector."""
+        vectors = np.asarray(vectors, dtype=np.float64)
+        batches = [vectors[start:start + batch_size] for start in range(0, len(vectors), batch_size)]
+        if not batches:
+            return np.empty((0, k)), self.ids[:0].reshape(0, k)
+        with ThreadPoolExecutor(max_workers=n_jobs or os.cpu_count()) as pool:
+            results = list(pool.map(lambda batch: self._query_batch(batch, k), batches))
+        return np.vstack([d for d, _ in results]), np.vstack([i for _, i in results])
+
+    def query(self, frame, k=10, batch_size=10_000, n_jobs=None):
+        """``query_vectors`` for users given by their raw features."""
+        return self.query_vectors(self.transform(frame), k, batch_size, n_jobs)
+
+    ##### Persistence
+
+    def save(self, root, name='lookalike_index'):
+        """Write the index to ``<root>/<name>/``."""
+        path = os.path.join(root, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, TREE_FILE), 'wb') as f:
+            pickle.dump(self.tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+        np.save(os.path.join(path, IDS_FILE), self.ids)
+        np.save(os.path.join(path, DELTA_FILE), self.delta)
+        np.save(os.path.join(path, DELTA_IDS_FILE), self.delta_ids)
+        with open(os.path.join(path, INDEX_FILE), 'w') as f:
+            json.dump(dict(self.meta, n_indexed=len(self.ids), n_delta=len(self.delta_ids)), f, indent=2)
+        self.path = path
+        return self
+
+
+def build_index(frame, ids, features=LOOKALIKE_FEATURES, algorithm='kd_tree', leaf_size=40,
+                rebuild_fraction=0.1):
+    """Standardize ``frame[features]`` (population std, like the feature store) and index it by ``ids``."""
+    features = list(features)
+    values = frame[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    mean = np.nanmean(values, axis=0)
+    scale = np.nanstd(values, axis=0)
+    scale[~(scale > 0)] = 1.0
+    vectors = (values - mean) / scale
+    vectors[~np.isfinite(vectors)] = 0.0
+
+    meta = {
+        'features': features,
+        'mean': mean.tolist(),
+        'scale': scale.tolist(),
+        'algorithm': algorithm,
+        'leaf_size': leaf_size,
+        'rebuild_fraction': rebuild_fraction,
+    }
+    ids = _as_ids(ids)
+    return NeighborIndex(_make_tree(vectors, algorithm, leaf_size), ids, meta)
+
+
+def open_index(root, name='lookalike_index'):
+    """Load an index written by ``NeighborIndex.save``."""
+    path = os.path.join(root, name)
+    with open(os.path.join(path, INDEX_FILE)) as f:
+        meta = json.load(f)
+    with open(os.path.join(path, TREE_FILE), 'rb') as f:
+        tree = pickle.load(f)
+    return NeighborIndex(tree, np.load(os.path.join(path, IDS_FILE)), meta,
+                         np.load(os.path.join(path, DELTA_FILE)), np.load(os.path.join(path, DELTA_IDS_FILE)),
+                         path)
+
+
+##### Lookalikes
+
+def find_lookalikes(index, frame, ids, k=10, batch_size=10_000, n_jobs=None):
+    """Long table of the ``k`` indexed users nearest to each user of ``frame``.
+
+    Columns: ``user_key``, ``rank`` (1 = most similar), ``lookalike_key``, ``distance``.
+    """
+    distances, neighbors = index.query(frame, k, batch_size, n_jobs)
+    n, k = distances.shape
+    return pd.DataFrame({
+        'user_key': np.repeat(np.asarray(ids), k),
+        'rank': np.tile(np.arange(1, k + 1), n),
+        'lookalike_key': np.char.decode(neighbors.ravel(), 'utf-8'),
+        'distance': distances.ravel(),
+    })
+
+
+def benchmark_index(index, queries, k=10, n_queries=1000, batch_sizes=(1, 100, 10_000), n_jobs=None):
+    """Query latency of ``index`` on standardized ``queries``.
+
+    Each batch size is timed over at least ``n_queries`` queries (wall time per
+    query and queries per second). The index is exact, so no recall is
+    reported.
+    """
+    queries = np.asarray(queries, dtype=np.float64)
+
+    rows = []
+    for batch_size in batch_sizes:
+        batch = queries[:max(batch_size, n_queries)]
+        start = time.perf_counter()
+        index.query_vectors(batch, k, batch_size=batch_size, n_jobs=n_jobs)
+        elapsed = time.perf_counter() - start
+        rows.append({'batch_size': batch_size, 'queries': len(batch),
+                     'ms_per_query': elapsed / len(batch) * 1000, 'queries_per_s': len(batch) / elapsed})
+    latency = pd.DataFrame(rows)
+    latency['k'] = k
+    latency['indexed_users'] = len(index)
+    return latency
+
+
+##### Stage
+
+def run_lookalike(input='df_segmented.csv', output='lookalikes.csv', index_dir='feature_store', k=10,
+                  rebuild=False, benchmark=False, n_jobs=None):
+    """Find the ``k`` former subscribers most similar to each free user.
+
+    The subscriber index is reopened from ``index_dir`` when it exists and
+    synced with ``input``: new subscribers are inserted incrementally, those
+    whose features changed are replaced and those no longer present removed
+    (``rebuild`` builds it from scratch, refitting the scaler). Returns the
+    lookalike table.
+    """
+    df_segmented = pd.read_csv(input)
+    subscribers = df_segmented[df_segmented['abonnement'] == 1].drop_duplicates('user_key')
+    free_users = df_segmented[df_segmented['abonnement'] == 0].drop_duplicates('user_key')
+
+    start = time.perf_counter()
+    if rebuild or not os.path.exists(os.path.join(index_dir, 'lookalike_index', INDEX_FILE)):
+        index = build_index(subscribers, subscribers['user_key'])
+        print(f"\n Lookalike index built over {len(index)} subscribers in {time.perf_counter() - start:.1f}s")
+    else:
+        index = open_index(index_dir)
+        added, updated, removed = index.sync(subscribers, subscribers['user_key'])
+        print(f"\n Lookalike index reopened: {added} subscribers added, {updated} updated, "
+              f"{removed} removed ({len(index)} indexed)")
+    index.save(index_dir)
+
+    lookalikes = find_lookalikes(index, free_users, free_users['user_key'], k=k, n_jobs=n_jobs)
+    lookalikes.to_csv(output, index=False)
+    print(f"\n {k} lookalike subscribers for each of {len(free_users)} free users saved as '{output}'.")
+
+    if benchmark:
+        print("\n Lookalike index benchmark:")
+        print(benchmark_index(index, index.transform(free_users), k=k, n_jobs=n_jobs).to_string(index=False))
+    return lookalikes
@@ -0,0 +1,327 @@
+"""Exploration and evaluation figures of the pipeline stages.
+
+This is the only module that imports matplotlib and seaborn; the stages import
+it only when figures are requested, so batch runs need neither a display nor
+the plotting libraries. ``Figures`` decides where each figure goes: on screen
+(the default) or to ``<directory>/<name>.png`` (set ``MPLBACKEND=Agg``, as the
+command-line interface does, to render without a display).
+"""
+
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+
+class Figures:
+    """Show each finished figure, or save it as ``<directory>/<name>.png``."""
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def show(self, name):
+        if self.directory is None:
+            plt.show()
+        else:
+            plt.savefig(os.path.join(self.directory, f'{name}.png'), bbox_inches='tight')
+            plt.close('all')
+
+
+def _slug(title):
+    # "Abonnement = 1" -> "abonnement_1"
+    return '_'.join(''.join(c if c.isalnum() else ' ' for c in title).lower().split())
+
+
+##### Preprocessing
+
+def add_percentage_labels(ax, total_count):
+    for p in ax.patches:
+        height = p.get_height()
+        if height > 0:
+            percentage = f"{(height / total_count) * 100:.1f}%"
+            ax.annotate(percentage, (p.get_x() + p.get_width() / 2., height),
+                        ha='center', va='bottom', fontsize=8, color='black', rotation=90)
+
+
+def plot_cms_exploration(figures, theme_counts, audience_counts, theme_audience_percentage):
+    """Theme and audience frequencies and the theme x audience heatmap."""
+    plt.figure(figsize=(14, 6))
+    ax = sns.barplot(x=theme_counts.index, y=theme_counts.values, palette="Blues_r", hue=theme_counts.index, dodge=False, legend=False)
+    plt.xticks(rotation=45, ha="right", fontsize=8)
+    plt.title("Theme Frequency", fontsize=12)
+    plt.xlabel("Theme", fontsize=10)
+    plt.ylabel("Count", fontsize=10)
+    add_percentage_labels(ax, theme_counts.sum())
+    figures.show('theme_frequency')
+
+    plt.figure(figsize=(14, 6))
+    ax = sns.barplot(x=audience_counts.index, y=audience_counts.values, palette="Greens_r", hue=audience_counts.index, dodge=False, legend=False)
+    plt.xticks(rotation=45, ha="right", fontsize=8)
+    plt.title("Audience Frequency", fontsize=12)
+    plt.xlabel("Audience Category", fontsize=10)
+    plt.ylabel("Count", fontsize=10)
+    add_percentage_labels(ax, audience_counts.sum())
+    figures.show('audience_frequency')
+
+    plt.figure(figsize=(14, 8))
+    sns.heatmap(theme_audience_percentage, annot=True, fmt=".1f", cmap="coolwarm", linewidths=0.5, cbar=True)
+    plt.title("Theme-Audience Distribution (%)", fontsize=12)
+    plt.xlabel("Audience", fontsize=10)
+    plt.ylabel("Theme", fontsize=10)
+    plt.xticks(rotation=45, ha="right", fontsize=8)
+    plt.yticks(rotation=0, fontsize=8)
+    figures.show('theme_audience_distribution')
+
+
+def _plot_subscriptions_cancellations(figures, subscribe_counts, cancel_counts, title, xlabel, name):
+    # Stacked subscription / cancellation bars annotated with their percentages
+    total_counts = subscribe_counts + cancel_counts.reindex(subscribe_counts.index, fill_value=0)
+    subscribe_percent = (subscribe_counts / total_counts * 100).fillna(0)
+    cancel_percent = (cancel_counts / total_counts * 100).fillna(0)
+
+    plt.figure(figsize=(12, 6))
+    bars1 = plt.bar(subscribe_counts.index, subscribe_counts.values, color='blue', alpha=0.7, label="Subscriptions")
+    bars2 = plt.bar(cancel_counts.index, cancel_counts.values, color='red', alpha=0.7, label="Cancellations",
+                    bottom=subscribe_counts.reindex(cancel_counts.index, fill_value=0).values)
+    for bar, percent in zip(bars1, subscribe_percent):
+        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_height() / 2, f"{percent:.1f}%", ha='center', va='center', color='white', fontsize=10)
+    for bar, percent in zip(bars2, cancel_percent):
+        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_y() + bar.get_height() / 2, f"{percent:.1f}%", ha='center', va='center', color='white', fontsize=10)
+
+    plt.xticks(rotation=45)
+    plt.title(title)
+    plt.xlabel(xlabel)
+    plt.ylabel("Count")
+    plt.legend()
+    figures.show(name)
+
+
+def _plot_calendar(figures, dates, start, end, cmap, title, name):
+    import calmap
+
+    days = pd.date_range(start=start, end=end, freq='D')
+    counts = pd.Series(1, index=pd.DatetimeIndex(dates.dropna())).groupby(level=0).count()
+    counts = counts.reindex(days, fill_value=0)
+
+    plt.figure(figsize=(12, 6))
+    calmap.yearplot(counts, year=2019, cmap=cmap)
+    plt.xlabel('Month')
+    plt.ylabel('Day')
+    plt.title(title)
+    figures.show(name)
+
+
+def plot_abo_exploration(figures, abo):
+    """Subscription / cancellation calendars, durations, trends and survival curve.
+
+    ``abo`` carries the month, weekday, duration and duration-category columns
+    added by ``preprocess.explore_abo``.
+    """
+    _plot_subscriptions_cancellations(
+        figures, abo['subscribe_month'].value_counts().sort_index(), abo['cancel_month'].value_counts().sort_index(),
+        "Subscriptions & Cancellations by Month (with Percentage)", "Month", 'subscriptions_by_month')
+    _plot_subscriptions_cancellations(
+        figures, abo['subscribe_weekday'].value_counts().sort_index(), abo['cancel_weekday'].value_counts().sort_index(),
+        "Subscriptions & Cancellations by Day of the Week (with Percentage)", "Day of the Week",
+        'subscriptions_by_weekday')
+
+    # Combined Box Plot and Histogram for Subscription Duration
+    fig, ax = plt.subplots(2, 1, figsize=(10, 8), gridspec_kw={'height_ratios': [1, 3]})
+    sns.boxplot(x=abo['subscription_duration'], ax=ax[0], color='purple')
+    ax[0].set_title('Subscription Duration Box Plot')
+    ax[0].set_xlabel('')
+    sns.histplot(abo['subscription_duration'], bins=30, kde=True, color='purple', ax=ax[1])
+    ax[1].set_title('Subscription Duration Distribution')
+    ax[1].set_xlabel('Duration (Days)')
+    ax[1].set_ylabel('Frequency')
+    plt.tight_layout()
+    figures.show('subscription_duration')
+
+    # Duration Categories with Percentages
+    duration_counts = abo['duration_category'].value_counts().sort_index()
+    duration_percent = (duration_counts / duration_counts.sum() * 100).fillna(0)
+    plt.figure(figsize=(8, 5))
+    bars = plt.bar(duration_counts.index.astype(str), duration_counts.values, color="blue", alpha=0.7)
+    for bar, percent in zip(bars, duration_percent):
+        plt.text(bar.get_x() + bar.get_width() / 2, bar.get_height() / 2, f"{percent:.1f}%", ha='center', va='center', color='white', fontsize=10)
+    plt.title("Subscription Duration Categories (with Percentage)")
+    plt.xlabel("Duration Category")
+    plt.ylabel("Count")
+    figures.show('subscription_duration_categories')
+
+    # Monthly Trends
+    abo_ts = abo.groupby(abo['subscribe_on'].dt.to_period("M")).size()
+    abo_cancel_ts = abo.groupby(abo['cancelled_on'].dt.to_period("M")).size()
+    plt.figure(figsize=(12, 6))
+    sns.lineplot(x=abo_ts.index.astype(str), y=abo_ts.values, label='Subscriptions', marker='o', color='blue')
+    sns.lineplot(x=abo_cancel_ts.index.astype(str), y=abo_cancel_ts.values, label='Cancellations', marker='o', color='red')
+    plt.xticks(rotation=45)
+    plt.title('Monthly Subscription & Cancellation Trends')
+    plt.xlabel('Month')
+    plt.ylabel('Count')
+    plt.legend()
+    figures.show('monthly_trends')
+
+    _plot_calendar(figures, abo['subscribe_on'], '2018-01-01', '2019-12-30', 'Blues',
+                   'Subscription Calendar Heatmap', 'subscription_calendar')
+    _plot_calendar(figures, abo['cancelled_on'], '2019-01-02', '2020-04-30', 'Reds',
+                   'Cancellation Calendar Heatmap', 'cancellation_calendar')
+
+    # Kaplan-Meier survival curve of the subscription duration (no censoring applied)
+    from lifelines import KaplanMeierFitter
+
+    kmf = KaplanMeierFitter()
+    kmf.fit(abo['subscription_duration'])
+    plt.figure(figsize=(10, 5))
+    kmf.plot_survival_function()
+    plt.title("Survival Curve of Subscription Duration")
+    plt.xlabel("Time (Days)")
+    plt.ylabel("Probability of Remaining Subscribed")
+    figures.show('survival_curve')
+
+
+##### Segmentation variables
+
+def plot_box(figures, values, title, xlabel, name):
+    plt.figure(figsize=(10, 5))
+    sns.boxplot(x=values)
+    plt.title(title)
+    plt.xlabel(xlabel)
+    figures.show(name)
+
+
+def plot_hist_box(figures, values, label, xlabel, color, name):
+    """Histogram and box plot of one feature side by side."""
+    plt.figure(figsize=(12, 5))
+
+    plt.subplot(1, 2, 1)
+    sns.histplot(values, bins=30, kde=True, color=color)
+    plt.title(f"Histogram of {label}")
+    plt.xlabel(xlabel)
+    plt.ylabel("Frequency")
+
+    plt.subplot(1, 2, 2)
+    sns.boxplot(x=values, color=color)
+    plt.title(f"Box Plot of {label}")
+    plt.xlabel(label)
+
+    plt.tight_layout()
+    figures.show(name)
+
+
+def plot_hist_box_rows(figures, df, features, name):
+    """One row of histogram + box plot per feature."""
+    plt.figure(figsize=(15, 10))
+    for i, feature in enumerate(features, 1):
+        plt.subplot(len(features), 2, 2 * i - 1)
+        sns.histplot(df[feature], bins=30, kde=True, color='blue')
+        plt.title(f"Histogram of {feature}")
+        plt.xlabel(feature)
+        plt.ylabel("Frequency")
+
+        plt.subplot(len(features), 2, 2 * i)
+        sns.boxplot(x=df[feature], color='blue')
+        plt.title(f"Box Plot of {feature}")
+        plt.xlabel(feature)
+
+    plt.tight_layout()
+    figures.show(name)
+
+
+def plot_feature_grid(figures, df, features, kind, name):
+    """Grid of histograms (``kind='hist'``) or box plots (``kind='box'``)."""
+    plt.figure(figsize=(15, 40))
+    for i, feature in enumerate(features, 1):
+        plt.subplot(len(features) // 3 + 1, 3, i)
+        if kind == 'hist':
+            sns.histplot(df[feature], bins=30, kde=True, color='blue')
+            plt.title(f"Histogram of {feature}")
+            plt.ylabel("Frequency")
+        else:
+            sns.boxplot(x=df[feature], color='blue')
+            plt.title(f"Box Plot of {feature}")
+        plt.xlabel(feature)
+
+    plt.tight_layout()
+    figures.show(name)
+
+
+def plot_correlation(figures, correlation_matrix):
+    plt.figure(figsize=(12, 8))
+    sns.heatmap(correlation_matrix, annot=True, cmap='coolwarm', fmt='.2f', cbar=True, square=True)
+    plt.title("Correlation Heatmap of Features")
+    figures.show('correlation_heatmap')
+
+
+##### Segmentation
+
+def plot_dendrogram(figures, sample, title, weights=None):
+    """Ward dendrogram of a sample of a scaled group (unique vectors if ``weights``)."""
+    from scipy.cluster.hierarchy import dendrogram, linkage
+
+    from .compression import weighted_ward_linkage
+
+    plt.figure(figsize=(10, 5))
+    if weights is None:
+        dendrogram(linkage(np.asarray(sample), method='ward'))
+    else:
+        dendrogram(weighted_ward_linkage(sample, weights))
+    plt.title(f"Dendrogram for {title} (Sampled Data)")
+    plt.xlabel("Users")
+    plt.ylabel("Distance")
+    figures.show(f'dendrogram_{_slug(title)}')
+
+
+def _plot_scores(figures, ks, values, label, ylabel, title, name):
+    plt.figure(figsize=(8, 5))
+    plt.plot(ks, values, marker='o', linestyle='--', label=label)
+    plt.xlabel("Number of Clusters")
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.legend()
+    figures.show(name)
+
+
+def plot_kmeans_evaluation(figures, scores, title):
+    """Elbow (WCSS) and silhouette curves from ``segment.evaluate_kmeans``."""
+    _plot_scores(figures, scores.index, scores['wcss'], "WCSS", "WCSS",
+                 f"Elbow Method for {title}", f'elbow_{_slug(title)}')
+    _plot_scores(figures, scores.index, scores['silhouette'], "Silhouette Score", "Silhouette Score",
+                 f"Silhouette Scores for {title}", f'silhouette_{_slug(title)}')
+
+
+def plot_gmm_evaluation(figures, scores, title):
+    """BIC curve from ``segment.evaluate_gmm``."""
+    _plot_scores(figures, scores.index, scores['bic'], "BIC Score", "BIC",
+                 f"BIC Scores for {title}", f'bic_{_slug(title)}')
+
+
+def plot_stability(figures, stability):
+    """Mean ARI (+/- std) per k for each group of ``stability_analysis``."""
+    plt.figure(figsize=(8, 5))
+    for group, scores in stability.groupby(level='group'):
+        ks = scores.index.get_level_values('k')
+        plt.errorbar(ks, scores['ari_mean'], yerr=scores['ari_std'], marker='o', linestyle='--', capsize=3, label=group)
+    plt.xlabel("Number of Clusters")
+    plt.ylabel("Mean ARI vs Full-Data Solution")
+    plt.title("Clustering Stability by K")
+    plt.legend()
+    figures.show('stability')
+
+
+def plot_tsne(figures, data_scaled, labels, title):
+    from sklearn.manifold import TSNE
+
+    tsne = TSNE(n_components=2, random_state=0)
+    tsne_data = tsne.fit_transform(np.asarray(data_scaled))
+
+    plt.figure(figsize=(7, 7))
+    sns.scatterplot(x=tsne_data[:, 0], y=tsne_data[:, 1], hue=np.asarray(labels), palette="viridis")
+    plt.xlabel("t-SNE 1")
+    plt.ylabel("t-SNE 2")
+    plt.title(f"t-SNE Clustering Visualization - {title}")
+    figures.show(f'tsne_{_slug(title)}')
@@ -0,0 +1,308 @@
+"""Preprocessing stage: load, profile and merge the inputs, engineer user features.
+
+Reads ``abo.csv``, ``visionnements.csv`` and ``cms.csv``, writes the
+data-quality reports and the merged event-level dataset ``df.csv`` (one row per
+viewing event, with the user-level features joined on ``user_key``).
+"""
+
+import calendar
+import os
+
+import pandas as pd
+
+from .data_quality import profile_table, update_report
+from .identity_resolution import HASH_PATTERN, resolve_user_keys, hot_keys, identity_summary
+from .user_features import compute_user_features, compute_user_features_partitioned
+from .windowed_features import compute_windowed_features
+
+
+# Engagement-related features of the missing-value analysis
+MISSING_FEATURES = ['enchainement', 'type_declenchement', 'reprise_media', 'progress_marker_75_percent', 'progress_marker_95_percent']
+DATE_COLUMNS = ['date', 'subscribe_on', 'cancelled_on']
+
+
+##### Data Loading
+
+def load_and_inspect(filename):
+    """Load a CSV file and display basic info."""
+    df = pd.read_csv(filename)
+    print(f"\n--- {filename} ---")
+    print(df.info())
+    print(df.head())
+    return df
+
+
+def load_inputs(data_dir='.'):
+    """Return ``(abo, visionnements, cms)`` read from ``data_dir``."""
+    abo = load_and_inspect(os.path.join(data_dir, "abo.csv"))
+    visionnements = load_and_inspect(os.path.join(data_dir, "visionnements.csv"))
+    cms = load_and_inspect(os.path.join(data_dir, "cms.csv"))
+    return abo, visionnements, cms
+
+
+def _print_changes(report, changes):
+    if len(changes):
+        print(f"\nData-quality changes in {report['table']} since the last run:")
+        print(changes.to_string(index=False))
+
+
+def profile_inputs(abo, visionnements, cms, quality_dir='data_quality'):
+    """Profile the three inputs in one pass each and save the reports.
+
+    Returns the reports keyed by table name.
+    """
+    reports = {
+        'abo': profile_table(abo, 'abo', keys=['rcid_hash']),
+        'visionnements': profile_table(visionnements, 'visionnements', keys=['rcid_hash'],
+                                       patterns={'rcid_hash': HASH_PATTERN}),
+        'cms': profile_table(cms, 'cms', keys=['emission']),
+    }
+    for report in reports.values():
+        _print_changes(report, update_report(report, quality_dir))
+
+    abo_ids = reports['abo']['keys']['rcid_hash']
+    print(f"Total Records: {reports['abo']['rows']}")
+    print(f"Unique IDs: {abo_ids['unique']}")
+    print(f"Duplicate IDs: {abo_ids['duplicates']}")
+
+    visionnements_ids = reports['visionnements']['keys']['rcid_hash']
+    print("**visionnements.csv Analysis**")
+    print(f"Total Records: {reports['visionnements']['rows']}")
+    print(f"Unique rcid_hash: {visionnements_ids['unique']}")
+    print(f"Duplicate rcid_hash: {visionnements_ids['duplicates']}\n")
+
+    print("**cms.csv Analysis**")
+    print(f"Total Records: {reports['cms']['rows']}")
+    print(f"Unique emission: {reports['cms']['keys']['emission']['unique']}")
+    return reports
+
+
+##### Exploration
+
+def explore_cms(cms):
+    """Print theme / audience frequencies; return them for plotting."""
+    theme_counts = cms['theme'].value_counts()
+    audience_counts = cms['audience'].value_counts()
+    theme_audience_counts = cms.groupby(['theme', 'audience']).size().unstack().fillna(0)
+    theme_audience_percentage = theme_audience_counts.div(theme_audience_counts.sum(axis=1), axis=0) * 100
+
+    print("\nTheme Frequency:\n", theme_counts)
+    print("\nAudience Frequency:\n", audience_counts)
+    print("\nTheme-Audience Distribution (%):\n", theme_audience_percentage)
+    return theme_counts, audience_counts, theme_audience_percentage
+
+
+def explore_abo(abo, abo_quality):
+    """Print the subscription checks and add calendar / duration columns to ``abo``."""
+    duplicate_count = abo_quality['keys']['rcid_hash']['duplicates']
+    unique_count = abo_quality['keys']['rcid_hash']['unique']
+    total_records = abo_quality['rows']
+
+    # Determine if the dataset is longitudinal
+    longitudinal = duplicate_count > 0
+    print(f"Total Records: {total_records}")
+    print(f"Unique IDs: {unique_count}")
+    print(f"Duplicate IDs (Longitudinal): {duplicate_count}")
+    print(f"Is the dataset longitudinal? {'Yes' if longitudinal else 'No'}")
+
+    missing_cancellations = abo_quality['columns']['cancelled_on']['nulls']
+    missing_percentage = (missing_cancellations / total_records) * 100
+    print(f"Missing Cancellations: {missing_cancellations}")
+    print(f"Percentage of Missing Cancellations: {missing_percentage:.2f}%")
+
+    # Subscription and cancellation months / weekdays, in calendar order
+    month_order = list(calendar.month_name[1:])
+    day_order = list(calendar.day_name)
+    for prefix, col in (('subscribe', 'subscribe_on'), ('cancel', 'cancelled_on')):
+        abo[f'{prefix}_month'] = pd.Categorical(abo[col].dt.strftime('%B'), categories=month_order, ordered=True)
+        abo[f'{prefix}_weekday'] = pd.Categorical(abo[col].dt.strftime('%A'), categories=day_order, ordered=True)
+
+    # Compute subscription duration (fill active users with 365 days)
+    abo['subscription_duration'] = (abo['cancelled_on'] - abo['subscribe_on']).dt.days.fillna(365)
+    abo['duration_category'] = pd.cut(abo['subscription_duration'],
+                                      bins=[0, 30, 90, 180, 365, 730, abo['subscription_duration'].max()],
+                                      labels=['<1M', '1-3M', '3-6M', '6-12M', '1-2Y', '2Y+'])
+
+    print(f"Subscription Date Range: {abo['subscribe_on'].min()} to {abo['subscribe_on'].max()}")
+    print(f"Cancellation Date Range: {abo['cancelled_on'].min()} to {abo['cancelled_on'].max()}")
+    return abo
+
+
+##### Data Merging & Feature Engineering
+
+def merge_datasets(visionnements, cms, abo):
+    """Parse ``titre`` and merge the events with the catalogue and subscriptions."""
+    # Extract 'programme', 'saison', and 'épisode' from 'titre'
+    visionnements[['programme', 'saison', 'épisode']] = visionnements['titre'].str.split(':', expand=True)
+    visionnements['saison'] = visionnements['saison'].str.extract(r'(\d+)').astype('Int64')
+    visionnements['épisode'] = visionnements['épisode'].str.extract(r'(\d+)').astype('Int64')
+
+    merged_df = visionnements.merge(cms, left_on='programme', right_on='emission', how='left')
+    df = merged_df.merge(abo, on='rcid_hash', how='left')
+    print("\nFinal Merged Dataset Info:")
+    print(df.info())
+    return df
+
+
+def engineer_features(df):
+    """Dates, resolved user keys, date features, ``abonnement`` and subscription duration."""
+    df = df.drop(columns=['titre', 'emission'])
+
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+
+    # Convert ID columns to string
+    df['visitor_id_hash'] = df['visitor_id_hash'].astype(str)
+    df['rcid_hash'] = df['rcid_hash'].astype(str)
+
+    # Resolve the per-user key: valid rcid_hash values are kept, while 'anonyme' and
+    # other non-hash values are keyed by visitor_id_hash so anonymous traffic is no
+    # longer aggregated as one giant user
+    df = resolve_user_keys(df)
+    print("\nIdentity Resolution (rows and users per identity type):")
+    print(identity_summary(df))
+    print("\nRemaining hot user keys (> 1% of rows):")
+    print(hot_keys(df['user_key']))
+
+    print(f"\nSubscription Date Range: {df['subscribe_on'].min()} to {df['subscribe_on'].max()}")
+    print(f"Cancellation Date Range: {df['cancelled_on'].min()} to {df['cancelled_on'].max()}")
+    print(f"Overall Date Range: {df['date'].min()} to {df['date'].max()}")
+
+    for col in DATE_COLUMNS:
+        df[f'{col}_year'] = df[col].dt.year
+        df[f'{col}_month'] = df[col].dt.month
+        df[f'{col}_day'] = df[col].dt.day
+        df[f'{col}_weekday'] = df[col].dt.day_name()
+        df[f'{col}_week_number'] = df[col].dt.isocalendar().week
+        df[f'{col}_is_weekend'] = df[col].dt.weekday.isin([5, 6])  # Saturday (5) & Sunday (6)
+
+    # Users who have a subscription date but no cancellation date (right-censored)
+    right_censored_users = df[(df['subscribe_on'].notna()) & (df['cancelled_on'].isna())]
+    print(f"\nNumber of Right-Censored Users (Active Subscribers): {right_censored_users['rcid_hash'].nunique()}")
+
+    multi_subscription_users = df.groupby('rcid_hash')['subscribe_on'].nunique()
+    users_with_multiple_subscriptions = multi_subscription_users[multi_subscription_users > 1].count()
+    print(f"\nUsers with Multiple Subscription Periods (Longitudinal Users): {users_with_multiple_subscriptions}")
+
+    # 'abonnement' is True if the user subscribed at least once
+    df['abonnement'] = df['subscribe_on'].notna()
+
+    # Compute subscription duration (fill active users with 365 days)
+    df['subscription_duration'] = (df['cancelled_on'] - df['subscribe_on']).dt.days.fillna(365)
+    df['duration_category'] = pd.cut(df['subscription_duration'],
+                                     bins=[0, 30, 90, 180, 365, 730, df['subscription_duration'].max()],
+                                     labels=['<1M', '1-3M', '3-6M', '6-12M', '1-2Y', '2Y+'])
+    return df
+
+
+def add_user_features(df, n_jobs=None, windows=None, as_of=None, window_anchor=None):
+    """Join the user-level features on ``user_key``.
+
+    Number of devices, distinct days and programmes, watch time, engagement
+    percentages, session features (unless ``date`` is day-level, see
+    ``user_features.use_sessions``) and theme/audience shares. With ``n_jobs > 1``
+    the events are hash-partitioned on ``user_key`` and processed on a process
+    pool; the result is identical to the in-process run. ``windows`` (e.g.
+    ``(7, 30, 90)``) adds last-N-day versions of the watch-time, programme,
+    active-day and percentage features, ending on ``as_of`` or on each user's
+    ``window_anchor`` date (see ``windowed_features``).
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    df['theme'] = df['theme'].fillna("Unknown")
+    df['audience'] = df['audience'].fillna("Unknown")
+
+    if n_jobs > 1:
+        user_features = compute_user_features_partitioned(df, n_jobs=n_jobs)
+    else:
+        user_features = compute_user_features(df)
+    if windows:
+        user_features = user_features.join(
+            compute_windowed_features(df, windows=windows, as_of=as_of, anchor=window_anchor))
+    return df.merge(user_features.reset_index(), on='user_key', how='left')
+
+
+##### Missing Value Analysis
+
+def missing_value_analysis(df, quality_dir='data_quality'):
+    """Profile the merged dataset in one pass, save the report and print the analysis.
+
+    Null rates overall and by 'modele' / 'theme', rcid_hash validity, watch time
+    for rows with missing progress markers and modele x login counts for rows
+    without a subscription.
+    """
+    df_quality = profile_table(
+        df, 'df', null_by=['modele', 'theme'], patterns={'rcid_hash': HASH_PATTERN},
+        describe_when={'watch_time_missing_progress': (
+            lambda c: c['progress_marker_75_percent'].isna() | c['progress_marker_95_percent'].isna(),
+            'content_time_spent')},
+        count_when={'missing_subscription_modele_login': (
+            lambda c: c['subscribe_on'].isna(), ['modele', 'statut_connexion'])})
+    _print_changes(df_quality, update_report(df_quality, quality_dir))
+
+    missing_values = pd.Series({col: stats['nulls'] for col, stats in df_quality['columns'].items()})
+    print("\n Missing Values in Dataset:")
+    print(missing_values[missing_values > 0])
+
+    missing_percentage = pd.Series({col: stats['null_percentage'] for col, stats in df_quality['columns'].items()})
+    missing_percentage_df = missing_percentage.reset_index()
+    missing_percentage_df.columns = ["Feature", "Missing Percentage"]
+    print("\n Missing Data Percentage:")
+    print(missing_percentage_df.sort_values(by="Missing Percentage", ascending=False))
+
+    print("\n Missing Data by Content Type (Modele):")
+    print(pd.DataFrame(df_quality['nulls_by']['modele']).T[MISSING_FEATURES])
+    print("\n Missing Data by Theme:")
+    print(pd.DataFrame(df_quality['nulls_by']['theme']).T[MISSING_FEATURES])
+
+    print("\n Watch Time Statistics for Users with Missing Progress Markers:")
+    print(pd.Series(df_quality['describe']['watch_time_missing_progress']))
+
+    missing_subscription_analysis = pd.DataFrame.from_dict(
+        df_quality['counts']['missing_subscription_modele_login'], orient='index')
+    missing_subscription_analysis = missing_subscription_analysis.reset_index()
+    missing_subscription_analysis.columns = ['modele|statut_connexion', 'Count', 'Percentage']
+    print("\n Modele, Subscription & Login Status Analysis:")
+    print(missing_subscription_analysis)
+
+    # Non-hash rcid_hash values (e.g. "anonyme", now keyed by visitor_id_hash)
+    non_hash_values = df_quality['patterns']['rcid_hash']
+    print(f"\n Number of non-hash rcid_hash entries: {non_hash_values['invalid_rows']}")
+    print("\n Non-Hash rcid_hash Values (first 20 unique):")
+    print(non_hash_values['invalid_values'])
+    return df_quality
+
+
+##### Stage
+
+def run_preprocess(data_dir='.', output='df.csv', quality_dir='data_quality', n_jobs=None, windows=None,
+                   as_of=None, window_anchor=None, figures=None):
+    """Run the preprocessing stage and return the merged dataset.
+
+    ``figures`` is a ``plots.Figures``; exploration plots are skipped (and the
+    plotting libraries never imported) when it is ``None``. ``windows``,
+    ``as_of`` and ``window_anchor`` add last-N-day user features
+    (``add_user_features``).
+    """
+    abo, visionnements, cms = load_inputs(data_dir)
+    reports = profile_inputs(abo, visionnements, cms, quality_dir)
+
+    abo['subscribe_on'] = pd.to_datetime(abo['subscribe_on'])
+    abo['cancelled_on'] = pd.to_datetime(abo['cancelled_on'])
+    visionnements['date'] = pd.to_datetime(visionnements['date'])
+
+    cms_counts = explore_cms(cms)
+    abo = explore_abo(abo, reports['abo'])
+    if figures is not None:
+        from . import plots
+
+        plots.plot_cms_exploration(figures, *cms_counts)
+        plots.plot_abo_exploration(figures, abo)
+
+    df = merge_datasets(visionnements, cms, abo)
+    df = engineer_features(df)
+    df = add_user_features(df, n_jobs, windows, as_of, window_anchor)
+    missing_value_analysis(df, quality_dir)
+
+    df.to_csv(output, index=False)
+    print(f"\nMerged dataset saved as '{output}'.")
+    return df
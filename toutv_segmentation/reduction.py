@@ -0,0 +1,201 @@
+"""Chunked PCA reduction of the user-level features ahead of clustering.
+
+``fit_reduction`` fits a PCA over a DataFrame or a CSV file read in chunks, so
+all segmentation variables can be used without holding a float64 copy of the
+full table:
+
+1. one pass accumulates exact per-feature means and standard deviations
+   (``summary_statistics.StreamingMoments``);
+2. a second pass standardizes each chunk and feeds it to ``IncrementalPCA``
+   (``method='incremental'``), or collects the standardized rows as float32
+   and fits a randomized-SVD ``PCA`` on them (``method='randomized'``).
+
+Missing or infinite values (e.g. ``median_session_gap_hours`` of single-session
+users) are replaced by the feature mean, i.e. 0 once standardized.
+``n_components`` is either a number of components or, when below 1, the
+fraction of variance to keep.
+
+A fitted ``Reduction`` is stored next to its projections in the feature store::
+
+    <root>/<name>/reduction.json   features, mean, scale, center, explained variance
+    <root>/<name>/components.npy   float64, n_components x n_features
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from .summary_statistics import StreamingMoments, iter_frame_chunks
+
+
+REDUCTION_FILE = 'reduction.json'
+COMPONENTS_FILE = 'components.npy'
+
+
+class Reduction:
+    """A fitted PCA: standardization, principal axes and explained variance."""
+
+    def __init__(self, meta, components, path=None):
+        self.meta = meta
+        self.components = components
+        self.path = path
+
+    @property
+    def features(self):
+        return self.meta['features']
+
+    @property
+    def mean(self):
+        return np.asarray(self.meta['mean'])
+
+    @property
+    def scale(self):
+        return np.asarray(self.meta['scale'])
+
+    @property
+    def center(self):
+        return np.asarray(self.meta['center'])
+
+    @property
+    def explained_variance_ratio(self):
+        return np.asarray(self.meta['explained_variance_ratio'])
+
+    @property
+    def n_components(self):
+        return self.components.shape[0]
+
+    @property
+    def columns(self):
+        return [f'pc_{i + 1}' for i in range(self.n_components)]
+
+    def standardize(self, frame):
+        """Standardized float64 values of the reduction features (missing -> 0)."""
+        return _standardize(frame, self.features, self.mean, self.scale)
+
+    def transform(self, frame, chunksize=1_000_000):
+        """Project ``frame`` onto the components, chunk by chunk, as float32."""
+        projections = np.empty((len(frame), self.n_components), dtype=np.float32)
+        for start in range(0, len(frame), chunksize):
+            values = self.standardize(frame.iloc[start:start + chunksize])
+            projections[start:start + chunksize] = (values - self.center) @ self.components.T
+        return projections
+
+    def transform_frame(self, frame, chunksize=1_000_000):
+        """``transform`` as a DataFrame with ``pc_*`` columns and the index of ``frame``."""
+        return pd.DataFrame(self.transform(frame, chunksize), index=frame.index, columns=self.columns)
+
+    def inverse_transform(self, projections):
+        """Map projections (e.g. cluster centers) back to raw feature units."""
+        standardized = np.asarray(projections, dtype=np.float64) @ self.components + self.center
+        return standardized * self.scale + self.mean
+
+
+def _standardize(frame, features, mean, scale):
+    values = frame[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    values = (values - mean) / scale
+    values[~np.isfinite(values)] = 0.0
+    return values
+
+
+def _chunks(source, features, chunksize):
+    # A DataFrame is sliced; anything else is read as a CSV file in chunks
+    if isinstance(source, pd.DataFrame):
+        return iter_frame_chunks(source, chunksize)
+    return pd.read_csv(source, usecols=features, chunksize=chunksize)
+
+
+def _batches(chunks, features, mean, scale, batch_size, min_rows):
+    # Standardized batches of ``batch_size`` rows; a short last batch is merged
+    # into the previous one so every batch has at least ``min_rows`` rows
+    pending = np.empty((0, len(features)))
+    previous = None
+    for chunk in chunks:
+        pending = np.vstack([pending, _standardize(chunk, features, mean, scale)])
+        while len(pending) >= batch_size:
+            if previous is not None:
+                yield previous
+            previous, pending = pending[:batch_size], pending[batch_size:]
+    if previous is not None and len(pending) < min_rows:
+        previous, pending = np.vstack([previous, pending]), pending[:0]
+    for batch in (previous, pending):
+        if batch is not None and len(batch):
+            yield batch
+
+
+def fit_reduction(source, features, n_components=0.9, method='incremental', batch_size=100_000,
+                  chunksize=1_000_000, seed=42):
+    """Fit a PCA of ``features`` over ``source`` (a DataFrame or a CSV path).
+
+    ``method`` is ``'incremental'`` (``IncrementalPCA`` over batches of
+    ``batch_size`` rows, bounded memory) or ``'randomized'`` (randomized-SVD
+    ``PCA`` on the standardized float32 matrix). Returns a ``Reduction`` keeping
+    ``n_components`` components, or the fewest explaining that fraction of the
+    variance when ``n_components < 1``.
+    """
+    from sklearn.decomposition import PCA, IncrementalPCA
+
+    features = list(features)
+    moments = [StreamingMoments() for _ in features]
+    rows = 0
+    for chunk in _chunks(source, features, chunksize):
+        rows += len(chunk)
+        values = chunk[features].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        values[~np.isfinite(values)] = np.nan
+        for column, summary in zip(values.T, moments):
+            summary.update(column)
+    mean = np.array([m.mean if m.count else 0.0 for m in moments])
+    scale = np.array([m.std(ddof=0) if m.count else 1.0 for m in moments])
+    scale[~(scale > 0)] = 1.0
+
+    variance = n_components if n_components < 1 else None
+    n_full = min(len(features), rows)
+    batches = _batches(_chunks(source, features, chunksize), features, mean, scale, batch_size, n_full)
+    if method == 'incremental':
+        # All components are tracked (there are only a few dozen variables), which
+        # keeps the incremental SVD exact; the leading ones are kept afterwards
+        model = IncrementalPCA(n_components=n_full)
+        for batch in batches:
+            model.partial_fit(batch)
+    elif method == 'randomized':
+        values = np.vstack([batch.astype(np.float32) for batch in batches])
+        n_fit = n_full if variance is not None else min(int(n_components), n_full)
+        model = PCA(n_components=n_fit, svd_solver='randomized', random_state=seed).fit(values)
+    else:
+        raise ValueError(f"Unknown method {method!r}, expected 'incremental' or 'randomized'")
+
+    ratio = model.explained_variance_ratio_
+    keep = min(int(n_components), len(ratio)) if variance is None else len(ratio)
+    if variance is not None:
+        keep = min(int(np.searchsorted(np.cumsum(ratio), variance - 1e-12)) + 1, len(ratio))
+    meta = {
+        'features': features,
+        'method': method,
+        'n_rows': int(rows),
+        'n_components': keep,
+        'mean': mean.tolist(),
+        'scale': scale.tolist(),
+        'center': model.mean_.tolist(),
+        'explained_variance_ratio': ratio[:keep].tolist(),
+    }
+    return Reduction(meta, model.components_[:keep].astype(np.float64))
+
+
+def write_reduction(reduction, root, name):
+    """Store a fitted reduction under ``<root>/<name>/``."""
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, COMPONENTS_FILE), reduction.components)
+    with open(os.path.join(path, REDUCTION_FILE), 'w') as f:
+        json.dump(reduction.meta, f, indent=2, ensure_ascii=False)
+    reduction.path = path
+    return reduction
+
+
+def open_reduction(root, name):
+    """Load a reduction written by ``write_reduction``."""
+    path = os.path.join(root, name)
+    with open(os.path.join(path, REDUCTION_FILE)) as f:
+        meta = json.load(f)
+    return Reduction(meta, np.load(os.path.join(path, COMPONENTS_FILE)), path)
@@ -0,0 +1,55 @@
+"""Report stage: summarize the data-quality reports and the cluster profiles."""
+
+import os
+
+import pandas as pd
+
+from .data_quality import read_report
+
+
+def quality_overview(quality_dir='data_quality'):
+    """One row per saved data-quality report: rows, worst null rate, duplicate and invalid keys."""
+    rows = []
+    if os.path.isdir(quality_dir):
+        for name in sorted(os.listdir(quality_dir)):
+            if not name.endswith('.json'):
+                continue
+            report = read_report(os.path.join(quality_dir, name))
+            null_rates = {col: stats['null_percentage'] or 0 for col, stats in report['columns'].items()}
+            worst = max(null_rates, key=null_rates.get) if null_rates else None
+            rows.append({
+                'table': report['table'],
+                'rows': report['rows'],
+                'max_null_column': worst,
+                'max_null_percentage': null_rates.get(worst),
+                'duplicate_keys': sum(stats['duplicates'] for stats in report['keys'].values()),
+                'invalid_ids': sum(stats['invalid_rows'] for stats in report['patterns'].values()),
+            })
+    return pd.DataFrame(rows, columns=['table', 'rows', 'max_null_column', 'max_null_percentage',
+                                       'duplicate_keys', 'invalid_ids'])
+
+
+def cluster_profiles(df_clusters):
+    """Size and mean of every numeric variable per (abonnement, cluster)."""
+    numeric = df_clusters.select_dtypes('number').drop(columns=['abonnement', 'cluster'])
+    grouped = numeric.groupby([df_clusters['abonnement'], df_clusters['cluster']])
+    return grouped.mean().assign(users=grouped.size()).round(2)
+
+
+def run_report(quality_dir='data_quality', clusters='df_clusters.csv'):
+    """Print the data-quality overview and, when available, the cluster profiles."""
+    overview = quality_overview(quality_dir)
+    if len(overview):
+        print("\n Data Quality Overview:")
+        print(overview.to_string(index=False))
+    else:
+        print(f"\n No data-quality reports in '{quality_dir}'.")
+
+    profiles = None
+    if os.path.exists(clusters):
+        profiles = cluster_profiles(pd.read_csv(clusters))
+        print("\n Cluster Profiles (mean per abonnement and cluster):")
+        print(profiles.T.to_string())
+    else:
+        print(f"\n No clustered users in '{clusters}'; run the 'segment' stage first.")
+    return overview, profiles
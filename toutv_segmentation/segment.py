@@ -0,0 +1,234 @@
+"""Segmentation stage: cluster each subscription group of ``df_segmented.csv``.
+
+Users are first split a priori by ``abonnement`` (former subscribers vs free
+users); each group is standardized into the feature store and clustered with
+K-Means, either on three hand-picked features or, with ``reduce``, on a PCA
+projection of all the segmentation variables. With ``compress``, duplicate
+rows are collapsed into weighted unique vectors (``compression``) before the
+models are fitted. The K evaluation (elbow, silhouette, GMM BIC), the
+subsample stability analysis and the plots are optional. scikit-learn is
+imported by the functions that need it.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .feature_store import write_feature_matrix
+from .variables import ID_COLUMNS
+
+
+# Clustering features and chosen number of clusters per group
+GROUPS = {
+    'Abonnement = 1': {'name': 'abonnement_1', 'abonnement': 1, 'k': 3,
+                       'features': ['num_devices', 'unique_programs', 'subscription_duration']},
+    'Abonnement = 0': {'name': 'abonnement_0', 'abonnement': 0, 'k': 2,
+                       'features': ['num_devices', 'unique_programs', 'avg_watch_time']},
+}
+K_VALUES = range(2, 7)
+# Columns never used as clustering variables
+NON_FEATURE_COLUMNS = ID_COLUMNS + ['abonnement', 'cluster']
+
+
+def clustering_features(df_segmented):
+    """All numeric segmentation variables (everything but IDs, ``abonnement`` and labels)."""
+    return [col for col in df_segmented.columns
+            if col not in NON_FEATURE_COLUMNS and pd.api.types.is_numeric_dtype(df_segmented[col])]
+
+
+def build_group_matrices(df_segmented, feature_store_dir='feature_store'):
+    """Standardize each group into a float32 memory-mapped matrix.
+
+    Each matrix keeps its ``user_key`` mapping and scaler parameters, so the
+    steps below and the parallel workers read it without copies. Returns the
+    ``FeatureMatrix`` of each group keyed by its title.
+    """
+    matrices = {}
+    for title, group in GROUPS.items():
+        rows = df_segmented[df_segmented['abonnement'] == group['abonnement']][group['features']].dropna()
+        matrices[title] = write_feature_matrix(feature_store_dir, group['name'], rows,
+                                               df_segmented.loc[rows.index, 'user_key'])
+    print("\n Data Loading and Filtering Completed Successfully!")
+    return matrices
+
+
+def build_reduced_matrices(df_segmented, feature_store_dir='feature_store', n_components=0.9,
+                           method='incremental'):
+    """Project each group on its own PCA of all clustering variables.
+
+    The reduction (``<group>_pca/reduction.json``) and the float32 projections
+    (a ``FeatureMatrix`` in the same directory) are written to the feature
+    store. ``n_components`` is a number of components or, below 1, the fraction
+    of variance to keep. Returns the ``FeatureMatrix`` of each group.
+    """
+    from .reduction import fit_reduction, write_reduction
+
+    features = clustering_features(df_segmented)
+    matrices = {}
+    for title, group in GROUPS.items():
+        rows = df_segmented[df_segmented['abonnement'] == group['abonnement']]
+        name = f"{group['name']}_pca"
+        reduction = write_reduction(fit_reduction(rows, features, n_components, method=method),
+                                    feature_store_dir, name)
+        matrices[title] = write_feature_matrix(feature_store_dir, name, reduction.transform_frame(rows),
+                                               rows['user_key'], standardize=False)
+        print(f"\n PCA for {title}: {len(features)} variables -> {reduction.n_components} components "
+              f"({reduction.explained_variance_ratio.sum():.1%} of the variance)")
+    print("\n Data Loading and Filtering Completed Successfully!")
+    return matrices
+
+
+def evaluate_kmeans(data_scaled, k_values=K_VALUES, sample_weight=None):
+    """WCSS and silhouette score of K-Means for each k.
+
+    With ``sample_weight`` (multiplicities of compressed rows) both scores are
+    those of the expanded rows.
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+
+    from .compression import weighted_silhouette_score
+
+    rows = []
+    for k in k_values:
+        kmeans = KMeans(n_clusters=k, random_state=42)
+        labels = kmeans.fit_predict(data_scaled, sample_weight=sample_weight)
+        if sample_weight is None:
+            silhouette = silhouette_score(data_scaled, labels)
+        else:
+            silhouette = weighted_silhouette_score(data_scaled, labels, sample_weight)
+        rows.append({'k': k, 'wcss': kmeans.inertia_, 'silhouette': silhouette})
+    return pd.DataFrame(rows).set_index('k')
+
+
+def evaluate_gmm(data_scaled, k_values=K_VALUES, sample_weight=None):
+    """BIC of a Gaussian mixture for each number of components.
+
+    ``GaussianMixture`` takes no sample weights, so weighted rows are fitted
+    with ``compression.WeightedGaussianMixture``.
+    """
+    from sklearn.mixture import GaussianMixture
+
+    from .compression import WeightedGaussianMixture
+
+    # The feature store is float32, on which the covariances of near-constant
+    # components can turn out non positive definite
+    data = np.asarray(data_scaled, dtype=np.float64)
+    rows = []
+    for k in k_values:
+        if sample_weight is None:
+            gmm = GaussianMixture(n_components=k, random_state=42).fit(data)
+            bic = gmm.bic(data)
+        else:
+            gmm = WeightedGaussianMixture(n_components=k, random_state=42).fit(data, sample_weight)
+            bic = gmm.bic(data, sample_weight)
+        rows.append({'k': k, 'bic': bic})
+    return pd.DataFrame(rows).set_index('k')
+
+
+def assign_clusters(df_segmented, matrices, k_values=None, compressed=None):
+    """Fit K-Means on each group and write the labels to a ``cluster`` column.
+
+    ``k_values`` maps a group title to its number of clusters (the ``GROUPS``
+    defaults otherwise). Groups in ``compressed`` (title -> ``CompressedMatrix``)
+    are fitted on their weighted unique vectors and the labels expanded back.
+    """
+    from sklearn.cluster import KMeans
+
+    k_values = k_values or {}
+    compressed = compressed or {}
+    for title, matrix in matrices.items():
+        kmeans = KMeans(n_clusters=k_values.get(title, GROUPS[title]['k']), random_state=42)
+        if title in compressed:
+            unique = compressed[title]
+            labels = unique.expand(kmeans.fit_predict(unique.vectors, sample_weight=unique.weights))
+        else:
+            labels = kmeans.fit_predict(matrix.data)
+        df_segmented.loc[matrix.index, 'cluster'] = labels
+    print("\n K-Means Clustering Completed!")
+    return df_segmented
+
+
+def run_segment(input='df_segmented.csv', output='df_clusters.csv', feature_store_dir='feature_store',
+                k_values=None, reduce=None, reduce_method='incremental', compress=False, quantize=None,
+                evaluate=False, stability=False, n_replicates=50, n_jobs=None, figures=None, subset_size=10000):
+    """Run the segmentation stage and return ``df_segmented`` with its ``cluster`` column.
+
+    With ``reduce`` (components, or fraction of variance below 1) every group is
+    clustered on a PCA projection of all its variables (``build_reduced_matrices``)
+    instead of the ``GROUPS`` features. ``compress`` fits K-Means, the
+    evaluation and the dendrograms on the unique rows of each group weighted by
+    their multiplicity, after rounding to multiples of ``quantize`` (in
+    standardized units) if given. ``evaluate`` prints the elbow /
+    silhouette / BIC tables for k in 2..6 and ``stability`` the subsample
+    stability of K-Means (both off by default as they refit many models). With
+    ``figures`` (a ``plots.Figures``), dendrograms on a ``subset_size`` sample,
+    the evaluation curves and t-SNE maps are drawn.
+    """
+    if figures is not None:
+        from . import plots
+
+    df_segmented = pd.read_csv(input)
+    if reduce:
+        matrices = build_reduced_matrices(df_segmented, feature_store_dir, reduce, reduce_method)
+    else:
+        matrices = build_group_matrices(df_segmented, feature_store_dir)
+
+    compressed = {}
+    if compress or quantize:
+        from .compression import compress_rows
+
+        for title, matrix in matrices.items():
+            compressed[title] = compress_rows(matrix.data, quantize)
+            print(f"\n {title}: {compressed[title].n_rows} users -> {compressed[title].n_unique} unique vectors "
+                  f"({compressed[title].ratio:.1f} users per vector)")
+
+    if figures is not None:
+        # Hierarchical clustering is O(n²): dendrograms use a seeded sample,
+        # or all the unique vectors of a compressed group when they are few enough
+        rng = np.random.default_rng(42)
+        for title, matrix in matrices.items():
+            unique = compressed.get(title)
+            if unique is not None and unique.n_unique <= subset_size:
+                plots.plot_dendrogram(figures, unique.vectors, title, weights=unique.weights)
+                continue
+            n_rows = matrix.shape[0]
+            sample = matrix.data[rng.choice(n_rows, min(subset_size, n_rows), replace=False)]
+            if unique is not None:
+                sample = compress_rows(sample, quantize)
+                plots.plot_dendrogram(figures, sample.vectors, title, weights=sample.weights)
+            else:
+                plots.plot_dendrogram(figures, sample, title)
+
+    if evaluate:
+        for title, matrix in matrices.items():
+            unique = compressed.get(title)
+            data, weights = (matrix.data, None) if unique is None else (unique.vectors, unique.weights)
+            kmeans_scores = evaluate_kmeans(data, sample_weight=weights)
+            gmm_scores = evaluate_gmm(data, sample_weight=weights)
+            print(f"\n K-Means and GMM evaluation for {title}:")
+            print(kmeans_scores.join(gmm_scores))
+            if figures is not None:
+                plots.plot_kmeans_evaluation(figures, kmeans_scores, title)
+                plots.plot_gmm_evaluation(figures, gmm_scores, title)
+
+    if stability:
+        # Refit K-Means on subsamples of each group in a process pool and compare
+        # each replicate to the full-data solution (ARI) and to the others
+        # (co-assignment consistency, PAC)
+        from .stability_analysis import stability_analysis
+
+        scores = stability_analysis(matrices, k_values=K_VALUES, n_replicates=n_replicates,
+                                    sample_fraction=0.8, n_jobs=n_jobs)
+        print(f"\n Clustering Stability (K-Means, {n_replicates} subsamples of 80%):")
+        print(scores)
+        if figures is not None:
+            plots.plot_stability(figures, scores)
+
+    df_segmented = assign_clusters(df_segmented, matrices, k_values, compressed)
+    if figures is not None:
+        for title, matrix in matrices.items():
+            plots.plot_tsne(figures, matrix.data, df_segmented.loc[matrix.index, 'cluster'], title)
+
+    df_segmented.to_csv(output, index=False)
+    print(f"\n Clustered users saved as '{output}'.")
+    return df_segmented
@@ -0,0 +1,164 @@
+"""Vectorized sessionization of viewing events.
+
+Events are sorted once by (user, timestamp). A new session starts at the first
+event of a user or when the idle time since the end of the previous event
+(start + ``content_time_spent``) exceeds ``gap``. Session ids are the cumulative
+sum of those break flags, so the whole pass is a handful of NumPy operations
+and grouped reductions, with no per-user Python loop.
+
+Sessions need ``date`` to carry a time of day. If the source only has the
+viewing day (every timestamp at midnight), all of a user's events of one day
+fall in one session, so ``session_count`` equals ``day_watching`` and the
+duration and gap features are meaningless; ``session_features`` warns in that
+case and ``user_features.compute_user_features`` leaves the session features
+out (see ``has_time_of_day``).
+
+Per-user features:
+
+- ``session_count``: number of sessions;
+- ``median_session_minutes``: median session length (first start to last end);
+- ``avg_events_per_session``: mean number of viewing events per session;
+- ``binge_episodes_per_session``: mean number of events per session that
+  continue the same ``programme`` as the previous event (episode chaining);
+- ``pct_binge_sessions``: % of sessions with at least ``binge_min_episodes - 1``
+  chained events, i.e. ``binge_min_episodes`` episodes watched back to back;
+- ``pct_reprise_sessions``: % of sessions that start with a resumed video;
+- ``median_session_gap_hours``: median idle time between consecutive sessions
+  (NaN for users with a single session).
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+SESSION_FEATURES = ['session_count', 'median_session_minutes', 'avg_events_per_session',
+                    'binge_episodes_per_session', 'pct_binge_sessions', 'pct_reprise_sessions',
+                    'median_session_gap_hours']
+
+
+def has_time_of_day(times):
+    """True when some non-missing timestamp of ``times`` is not at midnight."""
+    times = pd.to_datetime(pd.Series(times)).dropna().to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    return bool(np.any(times % pd.Timedelta(days=1).value))
+
+
+def _user_time_order(user_codes, times):
+    # Sort by (user, time) with one argsort over a packed int64 key, which is
+    # several times faster than np.lexsort on tens of millions of rows. Times
+    # are reduced to their coarsest exact unit (or to dense ranks) to fit.
+    if len(times) == 0:
+        return np.empty(0, dtype=np.intp)
+    offsets = times - times.min()
+    for unit in (10 ** 9, 10 ** 6, 10 ** 3, 1):
+        if not np.any(offsets % unit):
+            offsets //= unit
+            break
+    user_bits = int(user_codes.max()).bit_length()
+    if int(offsets.max()).bit_length() + user_bits > 62:
+        offsets = np.unique(offsets, return_inverse=True)[1].ravel()
+    key = (user_codes.astype(np.int64) << int(offsets.max()).bit_length()) | offsets
+    # Stable, so events with the same timestamp keep their input order
+    return np.argsort(key, kind='stable')
+
+
+def assign_sessions(df, user_col='user_key', time_col='date', duration_col='content_time_spent',
+                    gap=pd.Timedelta(minutes=30), duration_unit='s'):
+    """Return ``(order, user_codes, user_keys, session_ids, starts, ends)`` for ``df``.
+
+    ``order`` sorts the rows of ``df`` by (user, timestamp); ``user_codes``,
+    ``session_ids``, ``starts`` and ``ends`` are aligned with that order and
+    ``user_keys[code]`` gives the user of a code. ``ends`` is the latest end
+    seen so far in the user's stream, so at the last event of a session it is
+    the end of that session. Times are int64 nanoseconds.
+    """
+    user_codes, user_keys = pd.factorize(df[user_col])
+    starts = pd.to_datetime(df[time_col]).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    if duration_col is not None and duration_col in df:
+        durations = pd.to_timedelta(df[duration_col].fillna(0).clip(lower=0), unit=duration_unit)
+        durations = durations.to_numpy(dtype='timedelta64[ns]').astype(np.int64)
+    else:
+        durations = np.zeros(len(df), dtype=np.int64)
+
+    order = _user_time_order(user_codes, starts)
+    user_codes = user_codes[order]
+    starts = starts[order]
+
+    # Idle time is measured from the latest end seen so far in the user's
+    # stream, so a long event overlapping the next ones keeps them together
+    ends = pd.Series(starts + durations[order]).groupby(user_codes).cummax().to_numpy()
+    new_session = np.ones(len(order), dtype=bool)
+    if len(order) > 1:
+        same_user = user_codes[1:] == user_codes[:-1]
+        idle = starts[1:] - ends[:-1]
+        new_session[1:] = ~same_user | (idle > pd.Timedelta(gap).value)
+    session_ids = np.cumsum(new_session) - 1
+    return order, user_codes, user_keys, session_ids, starts, ends
+
+
+def session_features(df, user_col='user_key', time_col='date', duration_col='content_time_spent',
+                     programme_col='programme', reprise_col='reprise_media',
+                     gap=pd.Timedelta(minutes=30), binge_min_episodes=3, duration_unit='s'):
+    """Compute per-user session features, indexed by ``user_col``."""
+    columns = [col for col in (user_col, time_col, duration_col, programme_col, reprise_col)
+               if col is not None and col in df]
+    valid = df[time_col].notna() & df[user_col].notna()
+    df = df[columns] if valid.all() else df.loc[valid, columns]
+
+    order, user_codes, user_keys, session_ids, starts, ends = assign_sessions(
+        df, user_col, time_col, duration_col, gap=gap, duration_unit=duration_unit)
+    n_events = len(order)
+    if n_events and not np.any(starts % pd.Timedelta(days=1).value):
+        warnings.warn(f"'{time_col}' has no time of day (every timestamp is at midnight): "
+                      "sessions collapse to viewing days", stacklevel=2)
+    n_sessions = session_ids[-1] + 1 if n_events else 0
+
+    # Episode chaining: same programme as the previous event of the session
+    chained = np.zeros(n_events, dtype=bool)
+    if programme_col in df and n_events > 1:
+        programme_codes = pd.factorize(df[programme_col])[0][order]
+        chained[1:] = ((session_ids[1:] == session_ids[:-1])
+                       & (programme_codes[1:] == programme_codes[:-1])
+                       & (programme_codes[1:] >= 0))
+
+    # Session-level arrays (sessions are ordered by user, then time)
+    first = np.flatnonzero(np.r_[True, np.diff(session_ids) != 0]) if n_events else np.empty(0, dtype=int)
+    last = np.r_[first[1:] - 1, n_events - 1] if n_events else first
+    session_user = user_codes[first]
+    session_start = starts[first]
+    session_end = ends[last]
+    session_minutes = (session_end - session_start) / 6e10
+    session_events = np.bincount(session_ids, minlength=n_sessions)
+    session_chained = np.bincount(session_ids, weights=chained, minlength=n_sessions)
+    if reprise_col in df:
+        session_reprise = df[reprise_col].to_numpy()[order[first]] == 'reprise'
+    else:
+        session_reprise = np.zeros(n_sessions, dtype=bool)
+
+    # Idle time before each session, within the same user
+    gap_hours = np.full(n_sessions, np.nan)
+    same_user = np.zeros(n_sessions, dtype=bool)
+    same_user[1:] = session_user[1:] == session_user[:-1]
+    gap_hours[same_user] = (session_start[same_user] - session_end[:-1][same_user[1:]]) / 3.6e12
+
+    # User-level reductions
+    n_users = len(user_keys)
+    counts = np.bincount(session_user, minlength=n_users)
+    users = np.flatnonzero(counts)
+    counts = counts[users]
+
+    def per_user_mean(values):
+        return np.bincount(session_user, weights=values, minlength=n_users)[users] / counts
+
+    medians = pd.DataFrame({'minutes': session_minutes, 'gap_hours': gap_hours}).groupby(session_user).median()
+    features = pd.DataFrame({
+        'session_count': counts,
+        'median_session_minutes': medians['minutes'].to_numpy(),
+        'avg_events_per_session': per_user_mean(session_events),
+        'binge_episodes_per_session': per_user_mean(session_chained),
+        'pct_binge_sessions': per_user_mean(session_chained >= binge_min_episodes - 1) * 100,
+        'pct_reprise_sessions': per_user_mean(session_reprise) * 100,
+        'median_session_gap_hours': medians['gap_hours'].to_numpy(),
+    }, index=pd.Index(user_keys[users], name=user_col))
+    return features[SESSION_FEATURES]
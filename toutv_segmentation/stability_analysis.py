@@ -0,0 +1,196 @@
+"""Bootstrap / subsample stability of clustering solutions.
+
+Every (group, k) pair is refitted on many resamples of its scaled feature
+matrix across a process pool. The matrices are placed once in shared memory (or
+reopened from their memory-mapped file) so workers read them in place instead
+of receiving a pickled copy per task.
+
+For each replicate the fitted model labels a fixed evaluation subset of the
+group. Stability is then reported per (group, k) as:
+
+- ``ari_mean`` / ``ari_std``: adjusted Rand index between the replicate labels
+  and the labels of the model fitted on the full group;
+- ``co_assignment``: mean over evaluation pairs of ``max(M, 1 - M)``, where
+  ``M`` is the fraction of replicates putting the pair in the same cluster
+  (1.0 means every pair is always together or always apart, 0.5 is chance);
+- ``pac``: proportion of ambiguous clustering, the share of pairs with
+  ``0.1 < M < 0.9`` (lower is more stable).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.metrics import adjusted_rand_score
+from sklearn.mixture import GaussianMixture
+
+
+# Matrices attached by each worker process, keyed by group
+_worker_matrices = {}
+_worker_segments = []
+
+
+##### Shared memory
+
+def share_matrix(data):
+    """Copy ``data`` into a new shared memory block and return ``(block, spec)``."""
+    data = np.ascontiguousarray(data)
+    block = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+    view = np.ndarray(data.shape, dtype=data.dtype, buffer=block.buf)
+    view[:] = data
+    return block, (block.name, data.shape, data.dtype.str)
+
+
+def attach_matrix(spec):
+    """Open a matrix shared by ``share_matrix`` without copying it."""
+    name, shape, dtype = spec
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+def _as_array(data):
+    # Accept feature_store.FeatureMatrix as well as plain arrays
+    return data if isinstance(data, np.ndarray) else data.data
+
+
+def _memmap_spec(data):
+    # Memory-mapped matrices (e.g. from feature_store) are already shared
+    # through the page cache: workers reopen the file instead of a copy.
+    if isinstance(data, np.memmap) and data.filename and data.flags['C_CONTIGUOUS']:
+        return ('memmap', data.filename, data.offset, data.shape, data.dtype.str)
+    return None
+
+
+def _open_spec(spec):
+    if spec[0] == 'memmap':
+        _, filename, offset, shape, dtype = spec
+        return None, np.memmap(filename, dtype=np.dtype(dtype), mode='r', offset=offset, shape=shape)
+    return attach_matrix(spec)
+
+
+def _init_worker(specs):
+    # Workers only read the matrices; the parent owns and unlinks the blocks.
+    # BLAS/OpenMP threads are pinned to one so the pool does not oversubscribe.
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+    for group, spec in specs.items():
+        block, matrix = _open_spec(spec)
+        if block is not None:
+            _worker_segments.append(block)
+        _worker_matrices[group] = matrix
+
+
+##### Replicates
+
+def _make_model(method, k, seed, n_init):
+    if method == 'kmeans':
+        return KMeans(n_clusters=k, random_state=seed, n_init=n_init)
+    if method == 'gmm':
+        return GaussianMixture(n_components=k, random_state=seed, n_init=n_init)
+    raise ValueError(f"unknown clustering method: {method}")
+
+
+def _fit_replicate(task):
+    """Fit one replicate and return the labels of the evaluation rows."""
+    group, k, replicate, seed, eval_index, options = task
+    data = _worker_matrices[group]
+    rng = np.random.default_rng(seed)
+    n_rows = data.shape[0]
+
+    if replicate < 0:
+        # Reference fit on the full group
+        sample = data
+    else:
+        size = min(int(round(options['sample_fraction'] * n_rows)), options['max_sample_size'] or n_rows)
+        size = max(size, k)
+        if options['resample'] == 'bootstrap':
+            rows = rng.integers(0, n_rows, size=size)
+        else:
+            rows = np.sort(rng.choice(n_rows, size=size, replace=False))
+        sample = data[rows]
+
+    model = _make_model(options['method'], k, int(rng.integers(2 ** 31)), options['n_init'])
+    model.fit(sample)
+    return group, k, replicate, model.predict(data[eval_index])
+
+
+##### Scores
+
+def co_assignment_scores(label_sets, ambiguous=(0.1, 0.9)):
+    """Return ``(co_assignment, pac)`` for a list of label vectors over the same rows."""
+    n_rows = len(label_sets[0])
+    together = np.zeros((n_rows, n_rows))
+    for labels in label_sets:
+        one_hot = (labels[:, None] == np.unique(labels)[None, :]).astype(float)
+        together += one_hot @ one_hot.T
+    together /= len(label_sets)
+    pairs = np.triu_indices(n_rows, k=1)
+    consensus = together[pairs]
+    co_assignment = np.maximum(consensus, 1 - consensus).mean()
+    pac = ((consensus > ambiguous[0]) & (consensus < ambiguous[1])).mean()
+    return co_assignment, pac
+
+
+def stability_analysis(groups, k_values=range(2, 7), method='kmeans', n_replicates=50,
+                       resample='subsample', sample_fraction=0.8, max_sample_size=None,
+                       eval_size=2000, n_init=10, n_jobs=None, seed=42, mp_context=None):
+    """Estimate the stability of each (group, k) clustering.
+
+    ``groups`` maps a group label to its scaled feature matrix. Memory-mapped
+    matrices (``feature_store.FeatureMatrix`` or ``np.memmap``) are reopened by
+    the workers from disk; anything else is copied once to shared memory.
+
+    Resamples are drawn without replacement (``resample='subsample'``,
+    ``sample_fraction`` of the rows, capped at ``max_sample_size``) or with
+    replacement (``resample='bootstrap'``). Returns one row per (group, k).
+    """
+    if resample not in ('subsample', 'bootstrap'):
+        raise ValueError("resample must be 'subsample' or 'bootstrap'")
+    k_values = list(k_values)
+    options = {'method': method, 'resample': resample, 'sample_fraction': sample_fraction,
+               'max_sample_size': max_sample_size, 'n_init': n_init}
+    seeds = np.random.SeedSequence(seed)
+
+    blocks, specs, tasks = [], {}, []
+    try:
+        for group, data in groups.items():
+            data = _as_array(data)
+            specs[group] = _memmap_spec(data)
+            if specs[group] is None:
+                block, specs[group] = share_matrix(data)
+                blocks.append(block)
+            n_rows = len(data)
+            group_seeds = seeds.spawn(1)[0]
+            eval_rng = np.random.default_rng(group_seeds.spawn(1)[0])
+            eval_index = np.sort(eval_rng.choice(n_rows, size=min(eval_size, n_rows), replace=False))
+            for k in k_values:
+                replicate_seeds = group_seeds.spawn(n_replicates + 1)
+                for replicate in range(-1, n_replicates):
+                    replicate_seed = replicate_seeds[replicate + 1].generate_state(1)[0]
+                    tasks.append((group, k, replicate, replicate_seed, eval_index, options))
+
+        results = {}
+        with ProcessPoolExecutor(max_workers=n_jobs or os.cpu_count(), mp_context=mp_context,
+                                 initializer=_init_worker, initargs=(specs,)) as pool:
+            for group, k, replicate, labels in pool.map(_fit_replicate, tasks, chunksize=4):
+                results.setdefault((group, k), {})[replicate] = labels
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    rows = []
+    for (group, k), labels in results.items():
+        reference = labels.pop(-1)
+        replicates = [labels[r] for r in sorted(labels)]
+        ari = np.array([adjusted_rand_score(reference, rep) for rep in replicates])
+        co_assignment, pac = co_assignment_scores(replicates)
+        rows.append({'group': group, 'k': k, 'ari_mean': ari.mean(), 'ari_std': ari.std(),
+                     'co_assignment': co_assignment, 'pac': pac})
+    return pd.DataFrame(rows).set_index(['group', 'k'])
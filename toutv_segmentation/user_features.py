@@ -0,0 +1,192 @@
+"""User-level engagement and content-preference features.
+
+``compute_user_features`` turns viewing events (one row per event, keyed by
+``user_key``) into one row per user. ``compute_user_features_partitioned``
+computes the same table in parallel: events are hash-partitioned on the user
+key into on-disk shards, each shard is processed independently on a process
+pool (every user's events live in exactly one shard), and the results are
+concatenated and sorted by user key, so the output does not depend on the
+number of shards or workers. Keys flagged by ``identity_resolution.hot_keys``
+get a shard of their own so one heavy key does not stall a worker's shard.
+"""
+
+import os
+import shutil
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .identity_resolution import hot_keys
+from .sessionization import has_time_of_day, session_features
+
+
+# Columns of the event table needed to compute the features
+EVENT_COLUMNS = ['visitor_id_hash', 'date', 'programme', 'content_time_spent', 'statut_connexion',
+                 'modele', 'enchainement', 'reprise_media', 'type_declenchement',
+                 'progress_marker_75_percent', 'progress_marker_95_percent', 'videoinitiate',
+                 'theme', 'audience']
+
+
+##### Serial computation
+
+def use_sessions(dates):
+    """Whether ``dates`` support the session features, warning when they do not.
+
+    With day-level dates (every timestamp at midnight) sessions collapse to
+    viewing days, so the session features would only repeat ``day_watching``
+    and are left out of the feature table.
+    """
+    dates = pd.to_datetime(pd.Series(dates)).dropna()
+    if dates.empty or has_time_of_day(dates):
+        return True
+    warnings.warn("'date' has no time of day (every timestamp is at midnight): "
+                  "the session features are left out", stacklevel=2)
+    return False
+
+
+def _share_pivot(events, key, column, categories=None):
+    # Percentage of each user's events per category of ``column``
+    values = events[column].fillna("Unknown")
+    counts = values.groupby([events[key], values]).size().unstack(fill_value=0)
+    if categories is not None:
+        counts = counts.reindex(columns=categories, fill_value=0)
+    counts.columns.name = None
+    return counts.div(counts.sum(axis=1), axis=0).mul(100)
+
+
+def event_flags(events):
+    """Boolean event flags behind the ``pct_*`` features, one column per feature."""
+    return pd.DataFrame({
+        'pct_not_logged_in': events['statut_connexion'] == False,
+        'pct_gratuit': events['modele'] == 'gratuit',
+        'pct_enchainement': events['enchainement'] == 'enchainement',
+        'pct_reprise': events['reprise_media'] == 'reprise',
+        'pct_actif': events['type_declenchement'] == 'actif',
+        'pct_progress_75': events['progress_marker_75_percent'] == 1,
+        'pct_progress_95': events['progress_marker_95_percent'] == 1,
+    })
+
+
+def compute_user_features(events, key='user_key', themes=None, audiences=None,
+                          session_gap=pd.Timedelta(minutes=30), sessions=None):
+    """Return one row of engagement, session and content features per ``key``.
+
+    ``themes`` / ``audiences`` fix the pivot columns (all values seen in
+    ``events`` by default). As in the merged dataset, the ``Unknown`` theme and
+    audience columns come out as ``Unknown_x`` and ``Unknown_y``. ``sessions``
+    toggles the session features; by default ``use_sessions`` decides from the
+    ``date`` column.
+    """
+    grouped = events.groupby(key)
+    features = pd.DataFrame({
+        'num_devices': grouped['visitor_id_hash'].nunique(),
+        'day_watching': pd.to_datetime(events['date']).dt.normalize().groupby(events[key]).nunique(),
+        'unique_programs': grouped['programme'].nunique(),
+        'total_watch_time': grouped['content_time_spent'].sum(),
+        'avg_watch_time': grouped['content_time_spent'].mean(),
+    })
+
+    # Percentages of events with a given flag, as vectorized boolean means
+    features = features.join(event_flags(events).groupby(events[key]).mean() * 100)
+    features['avg_videoinitiate'] = grouped['videoinitiate'].mean()
+
+    if sessions is None:
+        sessions = use_sessions(events['date'])
+    if sessions:
+        features = features.join(session_features(events, user_col=key, gap=session_gap))
+    features = features.merge(_share_pivot(events, key, 'theme', themes),
+                              how='left', left_index=True, right_index=True)
+    features = features.merge(_share_pivot(events, key, 'audience', audiences),
+                              how='left', left_index=True, right_index=True)
+    features.index.name = key
+    return features
+
+
+##### Hash-partitioned computation
+
+def shard_ids(keys, n_shards, hot=()):
+    """Assign each row to a shard by a stable hash of its key.
+
+    Keys in ``hot`` get dedicated shards numbered from ``n_shards`` upwards.
+    """
+    hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    shards = (hashes % np.uint64(n_shards)).astype(np.int64)
+    for i, hot_key in enumerate(hot):
+        shards[(keys == hot_key).to_numpy()] = n_shards + i
+    return shards
+
+
+def partition_events(chunks, shard_dir, n_shards, key='user_key', hot=(), columns=None):
+    """Write event chunks to ``shard_dir/shard_XXXX/part_XXXXX.pkl`` by key hash.
+
+    ``chunks`` is an iterable of DataFrames (e.g. ``pd.read_csv(..., chunksize=...)``)
+    so the full event table never needs to be in memory. ``shard_dir`` must be
+    empty or missing, since every part file of a shard is read back as one
+    user partition. Returns the shard directories that received rows, in
+    shard order.
+    """
+    if os.path.isdir(shard_dir) and os.listdir(shard_dir):
+        raise ValueError(f"Shard directory {shard_dir!r} is not empty; remove the shards of the previous run")
+    written = set()
+    for part, chunk in enumerate(chunks):
+        if columns is not None:
+            chunk = chunk[[key] + [col for col in columns if col in chunk]]
+        ids = shard_ids(chunk[key], n_shards, hot)
+        for shard, rows in chunk.groupby(ids, sort=True):
+            path = os.path.join(shard_dir, f'shard_{shard:04d}')
+            os.makedirs(path, exist_ok=True)
+            rows.to_pickle(os.path.join(path, f'part_{part:05d}.pkl'))
+            written.add(path)
+    return sorted(written)
+
+
+def _shard_features(task):
+    """Load one shard from disk and compute its user features."""
+    path, key, themes, audiences, session_gap, sessions = task
+    parts = [pd.read_pickle(os.path.join(path, name)) for name in sorted(os.listdir(path))]
+    events = pd.concat(parts, ignore_index=True)
+    return compute_user_features(events, key=key, themes=themes, audiences=audiences,
+                                 session_gap=session_gap, sessions=sessions)
+
+
+def compute_user_features_partitioned(events, key='user_key', n_shards=None, n_jobs=None,
+                                      shard_dir=None, hot_share=0.01, chunksize=1_000_000,
+                                      session_gap=pd.Timedelta(minutes=30), mp_context=None):
+    """Compute ``compute_user_features`` per hash partition on a process pool.
+
+    ``events`` is an in-memory event table; it is streamed to the shards in
+    ``chunksize`` slices. ``n_shards`` defaults to four per worker so shards stay
+    small and the pool stays balanced. Shards are written under ``shard_dir``
+    (a temporary directory, removed afterwards, by default), which must be
+    empty. An empty ``events`` table gives an empty feature table. Whether the
+    session features are computed is decided once, on all of ``events``.
+    """
+    n_jobs = n_jobs or os.cpu_count()
+    n_shards = n_shards or 4 * n_jobs
+    hot = list(hot_keys(events[key], max_share=hot_share).index)
+    themes = sorted(events['theme'].fillna("Unknown").unique())
+    audiences = sorted(events['audience'].fillna("Unknown").unique())
+    # Decided on the whole table so every shard has the same columns
+    sessions = use_sessions(events['date'])
+
+    cleanup = shard_dir is None
+    shard_dir = shard_dir or tempfile.mkdtemp(prefix='user_features_')
+    try:
+        chunks = (events.iloc[start:start + chunksize] for start in range(0, len(events), chunksize))
+        paths = partition_events(chunks, shard_dir, n_shards, key=key, hot=hot, columns=EVENT_COLUMNS)
+        tasks = [(path, key, themes, audiences, session_gap, sessions) for path in paths]
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=mp_context) as pool:
+            results = list(pool.map(_shard_features, tasks))
+    finally:
+        if cleanup:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+    if not results:
+        return compute_user_features(events.iloc[:0], key=key, themes=themes, audiences=audiences,
+                                     session_gap=session_gap, sessions=sessions)
+    features = pd.concat(results).sort_index()
+    features.index.name = key
+    return features
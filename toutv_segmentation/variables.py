@@ -0,0 +1,118 @@
+"""Segmentation-variables stage: from ``df.csv`` to ``df_segmented.csv``.
+
+Keeps one row per user with the aggregated variables, removes ``num_devices``
+outliers, derives ``watch_rate``, groups the detailed genres into four content
+families and drops redundant variables.
+"""
+
+import pandas as pd
+
+from .summary_statistics import summarize_chunks, iter_frame_chunks
+from .windowed_features import is_window_column
+
+
+ID_COLUMNS = ['rcid_hash', 'user_key', 'identity_type']
+
+SEGMENTATION_COLUMNS = ID_COLUMNS + [
+    'abonnement', 'num_devices', 'subscription_duration', 'duration_category',
+    'day_watching', 'unique_programs', 'total_watch_time', 'avg_watch_time', 'pct_not_logged_in',
+    'pct_gratuit', 'pct_enchainement', 'pct_reprise', 'pct_actif', 'pct_progress_75',
+    'pct_progress_95', 'avg_videoinitiate', 'session_count', 'median_session_minutes', 'avg_events_per_session',
+    'binge_episodes_per_session', 'pct_binge_sessions', 'pct_reprise_sessions', 'median_session_gap_hours',
+    'Alimentation', 'Biographie', 'Nature et environnement',
+    'Histoire', 'Magazine', 'Science', 'Société', 'Économie et politique', 'Art', 'Actualité',
+    'Animation', 'Comédie', 'Drame', 'Humour et variété', 'Suspense et horreur', 'Science-fiction et fantastique',
+    'Policier', 'Entrevues et talk-show', 'Docu-réalité', 'Spectacle', 'Aventure', 'Jeunesse', 'Jeu', 'Sport et aventure',
+    'Unknown_x', 'Pour la famille', 'Pour les petits', 'ados', 'Pour les plus grands', 'Unknown_y'
+]
+
+GENRE_GROUPS = {
+    'Educational_Informational': ['Alimentation', 'Biographie', 'Nature et environnement', 'Histoire', 'Magazine',
+                                  'Science', 'Société', 'Économie et politique', 'Art', 'Actualité'],
+    'Fiction_Entertainment': ['Animation', 'Comédie', 'Drame', 'Humour et variété', 'Suspense et horreur',
+                              'Science-fiction et fantastique', 'Policier'],
+    'Talk_Show_Reality': ['Entrevues et talk-show', 'Docu-réalité', 'Spectacle'],
+    'Adventure_Youth': ['Aventure', 'Jeunesse', 'Jeu', 'Sport et aventure'],
+}
+
+
+def load_user_rows(path='df.csv'):
+    """Read only the segmentation columns of ``path`` and keep one row per user.
+
+    Last-N-day features (``preprocess --windows``) are kept when present.
+    """
+    df_segmented = pd.read_csv(path, usecols=lambda col: col in SEGMENTATION_COLUMNS or is_window_column(col))
+    columns = [col for col in SEGMENTATION_COLUMNS if col in df_segmented]
+    columns += [col for col in df_segmented.columns if col not in SEGMENTATION_COLUMNS]
+    return df_segmented[columns].drop_duplicates()
+
+
+def remove_device_outliers(df_segmented, whisker=1.5):
+    """Drop users outside the IQR bounds of ``num_devices``.
+
+    The bounds come from a mergeable quantile sketch (one pass over chunks;
+    exact for small tables, ~1.3% rank error otherwise).
+    """
+    num_devices_summary = summarize_chunks(iter_frame_chunks(df_segmented), ['num_devices'])
+    lower_bound, upper_bound = num_devices_summary.iqr_bounds('num_devices', whisker=whisker)
+    df_segmented = df_segmented[(df_segmented['num_devices'] >= lower_bound) &
+                                (df_segmented['num_devices'] <= upper_bound)]
+    print(f"\n Outliers removed! Remaining records: {df_segmented.shape[0]}")
+    return df_segmented
+
+
+def group_genres(df_segmented):
+    """Sum the detailed genres into four families and merge the youngest audiences."""
+    df_segmented = df_segmented.drop(columns=['Unknown_x', 'Unknown_y'], errors='ignore')
+    for group, genres in GENRE_GROUPS.items():
+        df_segmented[group] = df_segmented[genres].sum(axis=1)
+    df_segmented = df_segmented.drop(columns=[genre for genres in GENRE_GROUPS.values() for genre in genres])
+    print("\n Genre Aggregation Complete! The dataset is now more compact with 4 main groups.")
+
+    df_segmented['For_All_Ages'] = df_segmented[['Pour la famille', 'Pour les petits']].sum(axis=1)
+    return df_segmented.drop(columns=['Pour la famille', 'Pour les petits'])
+
+
+def run_variables(input='df.csv', output='df_segmented.csv', figures=None):
+    """Run the segmentation-variables stage and return ``df_segmented``.
+
+    Distribution plots are drawn on ``figures`` (a ``plots.Figures``) when given.
+    """
+    if figures is not None:
+        from . import plots
+
+    df_segmented = load_user_rows(input)
+    df_segmented['abonnement'] = df_segmented['abonnement'].astype(int)
+
+    if figures is not None:
+        plots.plot_box(figures, df_segmented['num_devices'], "Box Plot of 'num_devices' Feature",
+                       "Number of Devices", 'num_devices_box')
+    df_segmented = remove_device_outliers(df_segmented)
+    if figures is not None:
+        plots.plot_hist_box(figures, df_segmented['subscription_duration'], "Subscription Duration",
+                            "Subscription Duration (Days)", 'blue', 'subscription_duration')
+
+    df_segmented = df_segmented.drop(columns=['duration_category'])
+
+    # Days watched per subscription duration
+    df_segmented['watch_rate'] = df_segmented['day_watching'] / df_segmented['subscription_duration']
+    if figures is not None:
+        plots.plot_hist_box(figures, df_segmented['watch_rate'], "Watch Rate",
+                            "Watch Rate (Days Watched / Subscription Duration)", 'green', 'watch_rate')
+        plots.plot_hist_box_rows(figures, df_segmented, ['unique_programs', 'total_watch_time', 'avg_watch_time'],
+                                 'watch_time_features')
+
+    df_segmented = df_segmented.drop(columns=['day_watching', 'total_watch_time'])
+    df_segmented = group_genres(df_segmented)
+    df_segmented = df_segmented.drop(columns=['pct_progress_95'])
+
+    if figures is not None:
+        features = [col for col in df_segmented.columns
+                    if col not in ID_COLUMNS and pd.api.types.is_numeric_dtype(df_segmented[col])]
+        plots.plot_feature_grid(figures, df_segmented, features, 'hist', 'feature_histograms')
+        plots.plot_feature_grid(figures, df_segmented, features, 'box', 'feature_box_plots')
+        plots.plot_correlation(figures, df_segmented.drop(columns=ID_COLUMNS).corr())
+
+    df_segmented.to_csv(output, index=False)
+    print(f"\n Prepared dataset for segmentation saved as '{output}'.")
+    return df_segmented
@@ -0,0 +1,119 @@
+"""Last-N-day versions of the user features.
+
+The lifetime aggregates of ``user_features`` cannot tell a user who stopped
+watching last month from an active one. ``compute_windowed_features`` computes,
+for each window of N days ending on a reference day (included):
+
+- ``total_watch_time_<N>d``: summed ``content_time_spent``;
+- ``unique_programs_<N>d``: distinct programmes;
+- ``day_watching_<N>d``: distinct active days;
+- ``pct_*_<N>d``: the ``user_features.event_flags`` rates (missing when the
+  user has no event in the window).
+
+The reference day is a common ``as_of`` date (the last event day by default)
+or, with ``anchor='cancelled_on'``, each user's latest cancellation date
+(``as_of`` for users who never cancelled). Events after the reference day are
+ignored.
+
+Events are sorted once by (user, day); every feature is then a difference of
+cumulative sums between two ``searchsorted`` boundaries per user and window,
+so each extra window costs two binary searches and a few subtractions instead
+of another filtered groupby. Distinct programmes and days are counted through
+"last occurrence" and "first event of the day" markers, which are exact
+because every window of a user ends at the same position.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from .user_features import event_flags
+
+
+WINDOWS = (7, 30, 90)
+WINDOW_PATTERN = re.compile(r'_\d+d$')
+
+
+def is_window_column(column):
+    """True for column names produced by ``compute_windowed_features``."""
+    return bool(WINDOW_PATTERN.search(column))
+
+
+def _days(values):
+    # Day numbers (days since epoch) and a mask of non-missing dates
+    days = pd.to_datetime(values, errors='coerce').to_numpy(dtype='datetime64[D]')
+    return days.astype(np.int64), ~np.isnat(days)
+
+
+def _cumsum(values):
+    return np.concatenate([np.zeros((1,) + values.shape[1:], dtype=values.dtype), np.cumsum(values, axis=0)])
+
+
+def compute_windowed_features(events, key='user_key', windows=WINDOWS, as_of=None, anchor=None):
+    """Return one row of last-N-day features per ``key`` for each N in ``windows``."""
+    codes, users = pd.factorize(events[key], sort=True)
+    days, valid = _days(events['date'])
+    valid &= codes >= 0
+    if not valid.any():
+        raise ValueError("No event with both a user key and a date")
+
+    if as_of is None:
+        as_of_day = days[valid].max()
+    else:
+        try:
+            parsed = pd.Timestamp(as_of)
+        except ValueError as exc:
+            raise ValueError(f"Cannot parse as_of={as_of!r} as a date") from exc
+        if pd.isna(parsed):
+            raise ValueError(f"Cannot parse as_of={as_of!r} as a date")
+        as_of_day = np.datetime64(parsed, 'D').astype(np.int64)
+    reference = np.full(len(users), as_of_day, dtype=np.int64)
+    if anchor is not None:
+        anchor_days, has_anchor = _days(events[anchor])
+        has_anchor &= valid
+        # Latest anchor date per user (users without one keep ``as_of``)
+        latest = pd.Series(anchor_days[has_anchor]).groupby(codes[has_anchor]).max()
+        reference[latest.index.to_numpy()] = latest.to_numpy()
+
+    keep = valid & (days <= reference[codes])
+    programme_codes = pd.factorize(events['programme'])[0]
+    flags = event_flags(events).to_numpy(dtype=np.int64)
+    watch_time = events['content_time_spent'].fillna(0).to_numpy(dtype=np.float64)
+
+    # The single sort: by user, then day
+    rows = np.flatnonzero(keep)
+    rows = rows[np.lexsort((days[rows], codes[rows]))]
+    user, day, programme = codes[rows], days[rows], programme_codes[rows]
+
+    first_day = day.min() if len(day) else 0
+    span = int(day.max() - first_day + 1) if len(day) else 1
+    sort_key = user * (span + 1) + (day - first_day)
+
+    new_day = np.ones(len(rows), dtype=np.int64)
+    new_day[1:] = (user[1:] != user[:-1]) | (day[1:] != day[:-1])
+    pairs = pd.Series(user * (int(programme_codes.max()) + 2) + programme + 1)
+    last_programme = (~pairs.duplicated(keep='last').to_numpy() & (programme >= 0)).astype(np.int64)
+
+    watch_sums = _cumsum(watch_time[rows])
+    day_sums = _cumsum(new_day)
+    programme_sums = _cumsum(last_programme)
+    flag_sums = _cumsum(flags[rows])
+
+    user_ids = np.arange(len(users), dtype=np.int64)
+    end = np.searchsorted(user, user_ids, side='right')
+    features = {}
+    flag_names = list(event_flags(events.iloc[:0]).columns)
+    for window in windows:
+        start_offset = np.clip(reference - window + 1 - first_day, 0, span)
+        start = np.searchsorted(sort_key, user_ids * (span + 1) + start_offset, side='left')
+        n_events = end - start
+        features[f'total_watch_time_{window}d'] = watch_sums[end] - watch_sums[start]
+        features[f'unique_programs_{window}d'] = programme_sums[end] - programme_sums[start]
+        features[f'day_watching_{window}d'] = day_sums[end] - day_sums[start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rates = (flag_sums[end] - flag_sums[start]) / n_events[:, None] * 100
+        for name, rate in zip(flag_names, rates.T):
+            features[f'{name}_{window}d'] = rate
+
+    return pd.DataFrame(features, index=pd.Index(users, name=key))